@@ -0,0 +1,25 @@
+import os
+
+# Kept free of UI imports so Database, Manage and the importer can locate the
+# data directory without loading flet or Main
+
+
+def get_app_data_path():
+    base = os.getenv("LOCALAPPDATA") or os.path.expanduser("~/.myapp")
+    path = os.path.join(base, "PersonalFinance")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_credentials_path():
+    base = get_app_data_path()
+    path = os.path.join(base, "credentials.txt")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def get_db_path():
+    base = get_app_data_path()
+    path = os.path.join(base, "database.db")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -1,29 +1,27 @@
 import flet as ft
-import sqlite3
-from Main import get_db_path
+import Ledger
+import ResultCache
+import RunningBalance
+import UpdateScheduler
+import ViewRegistry
 import datetime
 
 class BudgetReport:
-    def __init__(self, page, view: ft.View):
+    def __init__(self, page, view: ft.View, user_id: int):
         self.page = page
         self.view = view
+        self.user_id = user_id
+        self.updates = UpdateScheduler.get_scheduler(page)
+        self.views = ViewRegistry.get_registry(page)
         self.page.window_maximized = True
         self.page.window_full_screen = True
         self.page.scroll = ft.ScrollMode.AUTO
-        self.page.update()
 
         self.view.title = "Budget Report"
         self.view.bgcolor = "#E3F2FD"
 
         field_width = 360
 
-        self.date_picker = ft.DatePicker(
-            on_change=self.date_selected,
-            first_date=datetime.date(2000, 1, 1),
-            last_date=datetime.date(2025, 12, 31),
-        )
-        self.page.overlay.append(self.date_picker)
-
         self.date_field = ft.TextField(
             label="Enter Date (DD/MM/YYYY)",
             width=field_width,
@@ -41,7 +39,20 @@ class BudgetReport:
             label="Report Type",
             width=field_width,
             dense=True,
-            options=[ft.dropdown.Option("Monthly"), ft.dropdown.Option("Yearly")],
+            options=[
+                ft.dropdown.Option("Monthly"), ft.dropdown.Option("Yearly"),
+                ft.dropdown.Option("Month by Month"), ft.dropdown.Option("Year by Year")
+            ],
+            on_change=self.report_type_changed
+        )
+
+        self.span_dropdown = ft.Dropdown(
+            label="Years Back",
+            width=field_width,
+            dense=True,
+            value="5",
+            visible=False,
+            options=[ft.dropdown.Option(str(n)) for n in (3, 5, 10, 20)],
             on_change=lambda e: self.generate_button.focus()
         )
 
@@ -59,14 +70,23 @@ class BudgetReport:
             on_click=self.generate_report
         )
 
+        self.series_table = ft.DataTable(columns=[
+            ft.DataColumn(ft.Text("Period", size=14)),
+            ft.DataColumn(ft.Text("Income", size=14), numeric=True),
+            ft.DataColumn(ft.Text("Expenses", size=14), numeric=True),
+            ft.DataColumn(ft.Text("Interest", size=14), numeric=True),
+            ft.DataColumn(ft.Text("Net", size=14), numeric=True),
+            ft.DataColumn(ft.Text("Closing Balance", size=14), numeric=True),
+        ], rows=[], visible=False)
+
         self.report_display = ft.Container(
             bgcolor="white",
             padding=15,
             border_radius=15,
-            height=240,
+            height=380,
             width=780,
             border=ft.border.all(1, "#90CAF9"),
-            content=ft.Text("", size=14),
+            content=ft.Column([ft.Text("", size=14), self.series_table], scroll=ft.ScrollMode.AUTO),
             alignment=ft.alignment.top_left
         )
 
@@ -82,6 +102,7 @@ class BudgetReport:
         self.form_column = ft.Column([
             self.date_field,
             self.report_type_dropdown,
+            self.span_dropdown,
             self.generate_button
         ], spacing=15, horizontal_alignment=ft.CrossAxisAlignment.CENTER)
 
@@ -95,53 +116,104 @@ class BudgetReport:
         self.view.controls.clear()
         self.view.controls.append(self.main_layout)
 
+    @UpdateScheduler.handler
     def go_back(self, e):
         if len(self.page.views) > 1:
             self.page.views.pop()
-            self.page.update()
+            self.updates.request()
 
+    def reset(self):
+        # Called when the screen is shown again
+        self.date_field.value = ""
+        self.report_type_dropdown.value = None
+        self.span_dropdown.value = "5"
+        self.span_dropdown.visible = False
+        self.report_display.content.controls[0].value = ""
+        self.series_table.rows = []
+        self.series_table.visible = False
+
+    @UpdateScheduler.handler
     def open_date_picker(self):
-        self.date_picker.open = True
-        self.page.update()
+        self.views.pick_date(self.date_selected)
 
-    def date_selected(self, e):
-        if self.date_picker.value:
-            picked = self.date_picker.value
-            self.date_field.value = picked.strftime("%d/%m/%Y")
-            self.report_type_dropdown.focus()
-            self.page.update()
+    @UpdateScheduler.handler
+    def date_selected(self, picked):
+        self.date_field.value = picked.strftime("%d/%m/%Y")
+        self.report_type_dropdown.focus()
+        self.updates.request(self.date_field)
 
-    def fetch_data(self, selected_date, report_type):
+    @UpdateScheduler.handler
+    def report_type_changed(self, e):
+        self.span_dropdown.visible = self.report_type_dropdown.value == "Year by Year"
+        self.generate_button.focus()
+        self.updates.request(self.span_dropdown)
+
+    def generate_series(self, date, rtype):
+        if rtype == "Month by Month":
+            first_year, by = date.year, "month"
+        else:
+            first_year, by = date.year - int(self.span_dropdown.value or 5) + 1, "year"
         try:
-            conn = sqlite3.connect(get_db_path())
-            cursor = conn.cursor()
-
-            if report_type == "Monthly":
-                key = selected_date.strftime("%m")
-                year = selected_date.strftime("%Y")
-                cursor.execute("SELECT * FROM transactions WHERE strftime('%m', date) = ? AND strftime('%Y', date) = ?", (key, year))
-                transactions = cursor.fetchall()
-                cursor.execute("SELECT * FROM interest_calculations WHERE strftime('%Y', deposit_date) = ?", (selected_date.strftime("%Y"),))
-                interest = cursor.fetchall()
+            series = ResultCache.cached(
+                "series:" + by, (first_year, date.year), self.user_id,
+                lambda: Ledger.fetch_series(self.user_id, first_year, date.year, by),
+            )
+            if by == "month":
+                ends = [Ledger.month_range(datetime.date(year, month, 1))[1] for year in range(first_year, date.year + 1) for month in range(1, 13)]
             else:
-                key = selected_date.strftime("%Y")
-                cursor.execute("SELECT * FROM transactions WHERE strftime('%Y', date) = ?", (key,))
-                transactions = cursor.fetchall()
-                cursor.execute("SELECT * FROM interest_calculations WHERE strftime('%Y', deposit_date) = ?", (key,))
-                interest = cursor.fetchall()
-
-            conn.close()
-            return transactions, interest
+                ends = [f"{year + 1}-01-01" for year in range(first_year, date.year + 1)]
+            index = RunningBalance.get_index(self.user_id)
+            closing = [index.balance_through(datetime.date.fromisoformat(end) - datetime.timedelta(days=1)) for end in ends]
+        except Exception as ex:
+            self.show_snack_bar(f"Database error: {str(ex)}", "red")
+            return
+
+        heading = f"Report Type: {rtype}\nPeriod: {first_year}" + ("" if first_year == date.year else f" – {date.year}")
+        self.report_display.content.controls[0].value = heading
+        self.series_table.rows = [
+            ft.DataRow(cells=[
+                ft.DataCell(ft.Text(label, size=14)),
+                ft.DataCell(ft.Text(Ledger.format_money(income), size=14)),
+                ft.DataCell(ft.Text(Ledger.format_money(expense), size=14)),
+                ft.DataCell(ft.Text(Ledger.format_money(interest), size=14)),
+                ft.DataCell(ft.Text(Ledger.format_money(net), size=14)),
+                ft.DataCell(ft.Text(Ledger.format_money(balance), size=14)),
+            ])
+            for (label, income, expense, interest, net), balance in zip(series, closing)
+        ]
+        self.series_table.visible = True
+        self.updates.request(self.report_display, self.series_table)
+
+    def fetch_data(self, selected_date, report_type):
+        try:
+            month = selected_date.month if report_type == "Monthly" else None
+            return ResultCache.cached(
+                "breakdown", (selected_date.year, month), self.user_id,
+                lambda: Ledger.fetch_breakdown(self.user_id, selected_date.year, month),
+            )
         except Exception as ex:
             self.show_snack_bar(f"Database error: {str(ex)}", "red")
-            return [], []
+            return []
 
-    def calculate_budget(self, transactions, interest_data):
-        income = sum(t[3] for t in transactions if t[4] == "Income")
-        expenses = sum(t[3] for t in transactions if t[4] == "Expense")
-        interest = sum(i[6] for i in interest_data)
+    def calculate_budget(self, breakdown):
+        totals = {"Income": 0, "Expense": 0, "Interest": 0}
+        for kind, _, total, _ in breakdown:
+            totals[kind] = totals.get(kind, 0) + total
+        income, expenses, interest = totals["Income"], totals["Expense"], totals["Interest"]
         return income, expenses, interest, income - expenses + interest
 
+    def format_breakdown(self, breakdown):
+        lines = []
+        for kind in ("Income", "Expense", "Interest"):
+            rows = [row for row in breakdown if row[0] == kind]
+            if not rows:
+                continue
+            lines.append(f"\n{kind} by Classification:")
+            for _, classification, total, count in rows:
+                lines.append(f"    {classification or 'Unclassified'}: ₹ {Ledger.format_money(total)} ({count} entr{'y' if count == 1 else 'ies'})")
+        return "\n".join(lines)
+
+    @UpdateScheduler.handler
     def generate_report(self, e):
         if not self.date_field.value or not self.report_type_dropdown.value:
             self.show_snack_bar("Please select both date and report type.", "red")
@@ -150,27 +222,41 @@ class BudgetReport:
         date = datetime.datetime.strptime(self.date_field.value, "%d/%m/%Y")
         rtype = self.report_type_dropdown.value
 
-        transactions, interest_data = self.fetch_data(date, rtype)
+        if rtype in ("Month by Month", "Year by Year"):
+            self.generate_series(date, rtype)
+            return
+
+        breakdown = self.fetch_data(date, rtype)
 
-        if not transactions and not interest_data:
+        if not breakdown:
             self.show_snack_bar("No data found for this period.", "red")
             return
 
-        income, expense, interest, net = self.calculate_budget(transactions, interest_data)
+        income, expense, interest, net = self.calculate_budget(breakdown)
+        period_end = (Ledger.month_range(date.date()) if rtype == "Monthly" else Ledger.year_range(date.date()))[1]
+        try:
+            closing = RunningBalance.get_index(self.user_id).balance_through(
+                datetime.date.fromisoformat(period_end) - datetime.timedelta(days=1))
+        except Exception as ex:
+            self.show_snack_bar(f"Database error: {str(ex)}", "red")
+            return
 
         result = (
             f"Report Type: {rtype}\n"
             f"Period: {date.strftime('%B %Y') if rtype == 'Monthly' else date.strftime('%Y')}\n\n"
-            f"Total Income: ₹ {income:.2f}\n"
-            f"Total Expenses: ₹ {expense:.2f}\n"
-            f"Total Interest: ₹ {interest:.2f}\n"
-            f"Net Budget: ₹ {net:.2f}"
+            f"Total Income: ₹ {Ledger.format_money(income)}\n"
+            f"Total Expenses: ₹ {Ledger.format_money(expense)}\n"
+            f"Total Interest: ₹ {Ledger.format_money(interest)}\n"
+            f"Net Budget: ₹ {Ledger.format_money(net)}\n"
+            f"Closing Balance: ₹ {Ledger.format_money(closing)}\n"
+            f"{self.format_breakdown(breakdown)}"
         )
 
-        self.report_display.content.value = result
-        self.page.update()
+        self.report_display.content.controls[0].value = result
+        self.series_table.visible = False
+        self.updates.request(self.report_display, self.series_table)
 
     def show_snack_bar(self, msg, color):
         self.page.snack_bar = ft.SnackBar(ft.Text(msg, size=14), bgcolor=color)
         self.page.snack_bar.open = True
-        self.page.update()
\ No newline at end of file
+        self.updates.request()
\ No newline at end of file
@@ -0,0 +1,186 @@
+import threading
+import numpy as np
+import Database
+import Ledger
+
+INITIAL_CAPACITY = 1024
+LOAD_BATCH_SIZE = 100_000
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def day_numbers(dates):
+    return (np.array(dates, dtype="datetime64[D]") - EPOCH).astype(np.int32)
+
+
+def day_number(value):
+    return int((np.datetime64(Ledger.normalize_date(value), "D") - EPOCH).astype(np.int32))
+
+
+class ColumnarLedger:
+    # One user's transactions as parallel arrays: int64 id, int32 day number,
+    # int64 paise, int8 type code and int16 classification code (23 bytes a row).
+    # Particulars stay in SQLite; callers look them up by id when they need them.
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.size = 0
+        self.ids = np.empty(INITIAL_CAPACITY, dtype=np.int64)
+        self.days = np.empty(INITIAL_CAPACITY, dtype=np.int32)
+        self.amounts = np.empty(INITIAL_CAPACITY, dtype=np.int64)
+        self.types = np.empty(INITIAL_CAPACITY, dtype=np.int8)
+        self.classifications = np.empty(INITIAL_CAPACITY, dtype=np.int16)
+        # Income and Expense keep codes 0 and 1; legacy rows with other or no types get their own codes
+        self.type_names = list(Ledger.TRANSACTION_TYPES)
+        self._type_codes = {name: code for code, name in enumerate(self.type_names)}
+        self.classification_names = []
+        self._classification_codes = {}
+        self.version = None
+        self.rewrites = None
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return sum(column[:self.size].nbytes for column in (self.ids, self.days, self.amounts, self.types, self.classifications))
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        # Quarter steps keep the spare room to a fraction of a large ledger
+        self._resize(max(needed, capacity + capacity // 4))
+
+    def _resize(self, capacity):
+        for name in ("ids", "days", "amounts", "types", "classifications"):
+            old = getattr(self, name)
+            resized = np.empty(capacity, dtype=old.dtype)
+            resized[:self.size] = old[:self.size]
+            setattr(self, name, resized)
+
+    def _trim(self):
+        # After a full load, give back what doubling over-reserved
+        capacity = max(self.size, INITIAL_CAPACITY)
+        if capacity < len(self.ids):
+            self._resize(capacity)
+
+    def _code(self, name, names, codes):
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def append(self, rows):
+        # rows are (id, date, amount, type, classification) as stored
+        if not rows:
+            return
+        ids, dates, amounts, types, classifications = zip(*rows)
+        count = len(ids)
+        self._reserve(count)
+        end = self.size + count
+        self.ids[self.size:end] = ids
+        self.days[self.size:end] = day_numbers([date or EPOCH for date in dates])
+        self.amounts[self.size:end] = amounts
+        self.types[self.size:end] = [self._code(kind or "", self.type_names, self._type_codes) for kind in types]
+        codes, names = self._classification_codes, self.classification_names
+        self.classifications[self.size:end] = [self._code(name or "", names, codes) for name in classifications]
+        self.size = end
+
+    def _load_after(self, conn, last_id):
+        # +user_id keeps the planner on the rowid range instead of the date index and a sort
+        cursor = conn.execute('''
+            SELECT t.id, t.date, t.amount, ty.name, c.name FROM transactions t
+            LEFT JOIN transaction_types ty ON ty.id = t.type_id
+            LEFT JOIN classifications c ON c.id = t.classification_id
+            WHERE +t.user_id = ? AND t.id > ? ORDER BY t.id
+        ''', (self.user_id, last_id))
+        while True:
+            rows = cursor.fetchmany(LOAD_BATCH_SIZE)
+            if not rows:
+                break
+            self.append(rows)
+
+    def _matches_summary(self, conn):
+        row = conn.execute("SELECT income, expense, row_count FROM ledger_summary WHERE user_id = ?", (self.user_id,)).fetchone()
+        income, expense, count = row or (0, 0, 0)
+        amounts, types = self.amounts[:self.size], self.types[:self.size]
+        return count == self.size and amounts[types == 0].sum() == income and amounts[types == 1].sum() == expense
+
+    def refresh(self):
+        # New rows always carry larger ids, so inserts are appended in place.
+        # Any update or delete, or anything the running totals cannot explain, reloads.
+        with self._lock, Database.reader() as conn:
+            versions = dict(conn.execute(
+                "SELECT name, version FROM data_version WHERE name IN ('transactions', 'transactions_rewrites')"
+            ).fetchall())
+            if versions.get("transactions") == self.version and versions.get("transactions_rewrites") == self.rewrites:
+                return
+            if versions.get("transactions_rewrites") != self.rewrites:
+                self.size = 0
+            last_id = int(self.ids[self.size - 1]) if self.size else 0
+            self._load_after(conn, last_id)
+            if not self._matches_summary(conn):
+                self.size = last_id = 0
+                self._load_after(conn, 0)
+            if not last_id:
+                self._trim()
+            self.version = versions.get("transactions")
+            self.rewrites = versions.get("transactions_rewrites")
+
+    def mask(self, start=None, end=None, entry_type=None, classification=None, min_amount=None, max_amount=None):
+        # start is inclusive and end exclusive, like the rest of the ledger's date ranges
+        self.refresh()
+        selected = np.ones(self.size, dtype=bool)
+        if start is not None:
+            selected &= self.days[:self.size] >= day_number(start)
+        if end is not None:
+            selected &= self.days[:self.size] < day_number(end)
+        if entry_type is not None:
+            code = self._type_codes.get(entry_type, -2)
+            selected &= self.types[:self.size] == code
+        if classification is not None:
+            code = self._classification_codes.get(classification, -2)
+            selected &= self.classifications[:self.size] == code
+        if min_amount is not None:
+            selected &= self.amounts[:self.size] >= min_amount
+        if max_amount is not None:
+            selected &= self.amounts[:self.size] <= max_amount
+        return selected
+
+    def total(self, selected):
+        return int(self.amounts[:self.size][selected].sum()), int(selected.sum())
+
+    def summarize(self, selected, by="classification"):
+        amounts = self.amounts[:self.size][selected]
+        if by == "type":
+            codes, names = self.types[:self.size][selected].astype(np.int64), self.type_names
+        elif by == "classification":
+            codes, names = self.classifications[:self.size][selected].astype(np.int64), self.classification_names
+        elif by == "month":
+            months = (self.days[:self.size][selected].astype("datetime64[D]")).astype("datetime64[M]")
+            unique, codes = np.unique(months, return_inverse=True)
+            names = [str(month) for month in unique]
+        else:
+            raise ValueError(f"Unknown grouping: {by}")
+        if not len(amounts):
+            return []
+        # float64 adds whole paise exactly up to 2**53, far beyond any ledger total
+        totals = np.rint(np.bincount(codes, weights=amounts, minlength=len(names))).astype(np.int64)
+        counts = np.bincount(codes, minlength=len(names))
+        groups = [(names[code], int(totals[code]), int(counts[code])) for code in np.flatnonzero(counts)]
+        if by != "month":
+            groups.sort(key=lambda group: group[1], reverse=True)
+        return groups
+
+
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(user_id):
+    with _ledgers_lock:
+        ledger = _ledgers.get(user_id)
+        if ledger is None:
+            ledger = _ledgers[user_id] = ColumnarLedger(user_id)
+    ledger.refresh()
+    return ledger
@@ -0,0 +1,146 @@
+import sqlite3
+import threading
+import queue
+from contextlib import contextmanager
+import AppPaths
+
+# cache_size is in KiB when negative, mmap_size in bytes
+PRAGMA_PROFILES = {
+    "balanced": {"cache_size": -16000, "mmap_size": 64 * 1024 * 1024, "synchronous": "NORMAL"},
+    "durable": {"cache_size": -8000, "mmap_size": 0, "synchronous": "FULL"},
+    "fast": {"cache_size": -64000, "mmap_size": 256 * 1024 * 1024, "synchronous": "OFF"},
+}
+
+DEFAULT_PROFILE = "balanced"
+READER_POOL_SIZE = 4
+STATEMENT_CACHE_SIZE = 256
+
+
+class ConnectionPool:
+    def __init__(self, path, profile=DEFAULT_PROFILE, readers=READER_POOL_SIZE):
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Unknown pragma profile: {profile}")
+        self.path = path
+        self.profile = profile
+        self.reader_count = readers
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._readers = queue.Queue()
+        self._opened_readers = 0
+        self._reader_lock = threading.Lock()
+
+    def _open(self, read_only=False):
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            isolation_level=None,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        for name, value in PRAGMA_PROFILES[self.profile].items():
+            conn.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @contextmanager
+    def writer(self):
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open()
+            conn = self._writer
+            if conn.in_transaction:
+                # Nested use from the same thread joins the outer transaction
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+
+    @contextmanager
+    def reader(self):
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._reader_lock:
+                can_open = self._opened_readers < self.reader_count
+                if can_open:
+                    self._opened_readers += 1
+            conn = self._open(read_only=True) if can_open else self._readers.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self._readers.put(conn)
+
+    def vacuum(self):
+        # VACUUM cannot run inside a transaction, so it bypasses writer()
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open()
+            self._writer.execute("VACUUM")
+
+    def close(self):
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._reader_lock:
+            self._opened_readers = 0
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(AppPaths.get_db_path())
+    return _pool
+
+
+def configure(path=None, profile=DEFAULT_PROFILE, readers=READER_POOL_SIZE):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        if path is None:
+            path = AppPaths.get_db_path()
+        _pool = ConnectionPool(path, profile, readers)
+    return _pool
+
+
+def writer():
+    return get_pool().writer()
+
+
+def reader():
+    return get_pool().reader()
+
+
+def vacuum():
+    get_pool().vacuum()
+
+
+def close():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
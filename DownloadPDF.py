@@ -1,34 +1,27 @@
 import flet as ft
-import sqlite3
-from Main import get_db_path
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
-from reportlab.lib import colors
+import Ledger
+import PDFExport
+import UpdateScheduler
+import ViewRegistry
 import datetime
 
 
 class DownloadPDF:
-    def __init__(self, page, view: ft.View):
+    def __init__(self, page, view: ft.View, user_id: int):
         self.page = page
         self.view = view
+        self.user_id = user_id
+        self.updates = UpdateScheduler.get_scheduler(page)
+        self.views = ViewRegistry.get_registry(page)
         self.page.window_maximized = True
         self.page.window_full_screen = True
         self.page.scroll = ft.ScrollMode.AUTO
-        self.page.update()
 
         self.view.title = "Download PDF"
         self.view.bgcolor = "#E3F2FD"
 
         field_width = 360
 
-        # Date Picker
-        self.date_picker = ft.DatePicker(
-            on_change=self.date_selected,
-            first_date=datetime.date(2000, 1, 1),
-            last_date=datetime.date(2025, 12, 31),
-        )
-        self.page.overlay.append(self.date_picker)
-
         self.date_field = ft.TextField(
             label="Enter Date (DD/MM/YYYY)",
             width=field_width,
@@ -37,11 +30,38 @@ class DownloadPDF:
             dense=True,
             suffix=ft.IconButton(
                 icon="calendar_month",
-                on_click=lambda e: self.open_date_picker()
+                on_click=lambda e: self.open_date_picker(self.date_field)
             ),
             on_submit=lambda e: self.report_type_dropdown.focus()
         )
 
+        self.period_dropdown = ft.Dropdown(
+            label="Period",
+            width=field_width,
+            dense=True,
+            value="Month",
+            options=[
+                ft.dropdown.Option("Month"),
+                ft.dropdown.Option("Year"),
+                ft.dropdown.Option("Custom Range")
+            ],
+            on_change=self.period_changed
+        )
+
+        self.end_date_field = ft.TextField(
+            label="End Date (DD/MM/YYYY)",
+            width=field_width,
+            text_align=ft.TextAlign.CENTER,
+            read_only=True,
+            dense=True,
+            visible=False,
+            suffix=ft.IconButton(
+                icon="calendar_month",
+                on_click=lambda e: self.open_date_picker(self.end_date_field)
+            )
+        )
+        self.picking_field = self.date_field
+
         # Dropdown
         self.report_type_dropdown = ft.Dropdown(
             label="Report Type",
@@ -54,10 +74,6 @@ class DownloadPDF:
             on_change=lambda e: self.generate_button.focus()
         )
 
-        # File Picker
-        self.file_picker = ft.FilePicker(on_result=self.save_path_selected)
-        self.page.overlay.append(self.file_picker)
-
         # Button
         self.generate_button = ft.ElevatedButton(
             "Generate PDF",
@@ -68,6 +84,17 @@ class DownloadPDF:
             on_click=self.request_file_save_location
         )
 
+        # Export progress
+        self.progress_bar = ft.ProgressBar(width=field_width, value=0, visible=False, color="#1565C0", bgcolor="#BBDEFB")
+        self.progress_text = ft.Text("", size=14, color="#0D47A1")
+        self.cancel_button = ft.TextButton(
+            "Cancel Export",
+            visible=False,
+            on_click=self.cancel_export,
+            style=ft.ButtonStyle(color="#C62828")
+        )
+        self.current_job = None
+
         # Header and layout
         self.header = ft.Row([
             ft.IconButton(icon="arrow_back", on_click=self.go_back),
@@ -79,9 +106,14 @@ class DownloadPDF:
         ], alignment=ft.MainAxisAlignment.START, spacing=5)
 
         self.form_column = ft.Column([
+            self.period_dropdown,
             self.date_field,
+            self.end_date_field,
             self.report_type_dropdown,
-            self.generate_button
+            self.generate_button,
+            self.progress_bar,
+            self.progress_text,
+            self.cancel_button
         ], spacing=15, horizontal_alignment=ft.CrossAxisAlignment.CENTER)
 
         self.main_layout = ft.Column([
@@ -93,31 +125,62 @@ class DownloadPDF:
         self.view.controls.clear()
         self.view.controls.append(self.main_layout)
 
+    @UpdateScheduler.handler
     def go_back(self, e):
         if len(self.page.views) > 1:
             self.page.views.pop()
-            self.page.update()
-
-    def open_date_picker(self):
-        self.date_picker.open = True
-        self.page.update()
-
-    def date_selected(self, e):
-        if self.date_picker.value:
-            picked = self.date_picker.value
-            self.date_field.value = picked.strftime("%d/%m/%Y")
-            self.report_type_dropdown.focus()
-            self.page.update()
+            self.updates.request()
+
+    def reset(self):
+        # Called when the screen is shown again; a running export keeps reporting progress
+        self.date_field.value = ""
+        self.end_date_field.value = ""
+        self.period_dropdown.value = "Month"
+        self.date_field.label = "Enter Date (DD/MM/YYYY)"
+        self.end_date_field.visible = False
+        self.report_type_dropdown.value = None
+
+    @UpdateScheduler.handler
+    def open_date_picker(self, field):
+        self.picking_field = field
+        self.views.pick_date(self.date_selected)
+
+    @UpdateScheduler.handler
+    def date_selected(self, picked):
+        self.picking_field.value = picked.strftime("%d/%m/%Y")
+        self.report_type_dropdown.focus()
+        self.updates.request(self.picking_field)
+
+    @UpdateScheduler.handler
+    def period_changed(self, e):
+        custom = self.period_dropdown.value == "Custom Range"
+        self.date_field.label = "Start Date (DD/MM/YYYY)" if custom else "Enter Date (DD/MM/YYYY)"
+        self.end_date_field.visible = custom
+        self.updates.request(self.date_field, self.end_date_field)
+
+    def selected_range(self):
+        first_day = datetime.datetime.strptime(self.date_field.value, "%d/%m/%Y").date()
+        period = self.period_dropdown.value
+        if period == "Year":
+            return Ledger.year_range(first_day)
+        if period == "Custom Range":
+            last_day = datetime.datetime.strptime(self.end_date_field.value, "%d/%m/%Y").date()
+            return Ledger.custom_range(first_day, last_day)
+        return Ledger.month_range(first_day)
 
     def request_file_save_location(self, e):
         # Check fields first
         if not self.date_field.value or not self.report_type_dropdown.value:
             self.show_snack_bar("Please select report type and date.", "red")
             return
+        if self.period_dropdown.value == "Custom Range" and not self.end_date_field.value:
+            self.show_snack_bar("Please select an end date.", "red")
+            return
 
         default_name = self.report_type_dropdown.value.lower().replace(" ", "_") + "_report.pdf"
-        self.file_picker.save_file(dialog_title="Save PDF As", file_name=default_name)
+        self.views.save_file(self.save_path_selected, dialog_title="Save PDF As", file_name=default_name)
 
+    @UpdateScheduler.handler
     def save_path_selected(self, e: ft.FilePickerResultEvent):
         if not e.path:
             self.show_snack_bar("PDF save cancelled.", "red")
@@ -125,55 +188,55 @@ class DownloadPDF:
         self.generate_pdf_file(e.path)
 
     def generate_pdf_file(self, file_path):
-        report_type = self.report_type_dropdown.value
-        date_val = datetime.datetime.strptime(self.date_field.value, "%d/%m/%Y")
-        month = date_val.strftime("%m")
-        year = date_val.strftime("%Y")
-
-        pdf = SimpleDocTemplate(file_path, pagesize=letter)
-        elements = []
-
         try:
-            conn = sqlite3.connect(get_db_path())
-            cursor = conn.cursor()
-
-            if report_type == "Interest Calculator":
-                headers = ["Deposit Date", "Maturity Date", "Deposit Type", "Amount", "Interest Rate", "Time", "Maturity"]
-                data = [headers]
-                cursor.execute("SELECT * FROM interest_calculations WHERE strftime('%m', deposit_date) = ? AND strftime('%Y', deposit_date) = ?", (month, year))
-                entries = cursor.fetchall()
-                for row in entries:
-                    data.append([row[1], row[2], row[7], row[3], row[4], row[5], row[6]])
-
-            elif report_type == "Transaction Record":
-                headers = ["Date", "Particular", "Amount", "Type", "Classification"]
-                data = [headers]
-                cursor.execute("SELECT * FROM transactions WHERE strftime('%m', date) = ? AND strftime('%Y', date) = ?", (month, year))
-                entries = cursor.fetchall()
-                for row in entries:
-                    data.append([row[1], row[2], row[3], row[4], row[5]])
-
-            conn.close()
-
-            table = Table(data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0D47A1")),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#E3F2FD")),
-            ]))
-
-            elements.append(table)
-            pdf.build(elements)
-
-            self.show_snack_bar(f"PDF saved to: {file_path}", "green")
-
+            start, end = self.selected_range()
         except Exception as ex:
             self.show_snack_bar(f"Error: {str(ex)}", "red")
+            return
+
+        job = PDFExport.ExportJob(file_path, self.user_id, self.report_type_dropdown.value, start, end)
+        job.listeners.append(self.export_progress)
+        PDFExport.get_export_queue().submit(job)
+        # The submit notification adopts the job unless another one is still going
+        if self.current_job is not job:
+            self.show_snack_bar("Export queued behind the current one.", "#1565C0")
+
+    def export_progress(self, job):
+        # Runs on the export worker thread, outside any handler, so each request()
+        # goes out on its own; only the submit notification comes from the page
+        if job.status == "running" or self.current_job is None or self.current_job.finished:
+            self.current_job = job
+        if job is not self.current_job:
+            return
+
+        waiting = PDFExport.get_export_queue().waiting
+        queued_note = f" · {waiting} queued" if waiting else ""
+        self.progress_bar.visible = True
+        self.cancel_button.visible = not job.finished
+
+        if job.status == "queued":
+            self.progress_bar.value = None
+            self.progress_text.value = f"Waiting to start{queued_note}"
+        elif job.status == "running":
+            self.progress_bar.value = job.fraction
+            self.progress_text.value = f"{job.rows} of {job.total_rows} rows · {job.pages} pages{queued_note}"
+        else:
+            self.progress_bar.visible = False
+            self.progress_text.value = queued_note.lstrip(" ·")
+            if job.status == "done":
+                self.show_snack_bar(f"PDF saved to: {job.file_path} ({job.rows} rows)", "green")
+            elif job.status == "cancelled":
+                self.show_snack_bar("PDF export cancelled.", "red")
+            else:
+                self.show_snack_bar(f"Error: {str(job.error)}", "red")
+            return
+        self.updates.request(self.progress_bar, self.progress_text, self.cancel_button)
+
+    def cancel_export(self, e):
+        if self.current_job is not None:
+            self.current_job.cancel()
 
     def show_snack_bar(self, message, color):
         self.page.snack_bar = ft.SnackBar(ft.Text(message, size=14), bgcolor=color)
         self.page.snack_bar.open = True
-        self.page.update()
\ No newline at end of file
+        self.updates.request()
\ No newline at end of file
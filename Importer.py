@@ -0,0 +1,193 @@
+import csv
+import datetime
+import os
+import re
+import time
+from functools import lru_cache
+from itertools import islice
+import Ledger
+
+COMMIT_EVERY = 50000
+MAX_REJECTED_SAMPLES = 100
+DEFAULT_CLASSIFICATION = "Uncategorized"
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%m/%d/%Y", "%Y%m%d", "%d %b %Y", "%d-%b-%Y")
+
+# Header aliases seen in common bank statement exports, lower-cased
+CSV_COLUMNS = {
+    "date": ("date", "transaction date", "txn date", "value date", "posting date"),
+    "particular": ("particular", "particulars", "description", "narration", "details", "remarks", "name", "memo"),
+    "amount": ("amount", "amt", "transaction amount"),
+    "debit": ("debit", "withdrawal", "withdrawal amt.", "withdrawals", "dr"),
+    "credit": ("credit", "deposit", "deposit amt.", "deposits", "cr"),
+    "type": ("type", "dr/cr", "cr/dr"),
+    "classification": ("classification", "category"),
+}
+
+CLASSIFICATION_KEYWORDS = (
+    ("salary", "Salary"), ("payroll", "Salary"),
+    ("rent", "Bills/Rent"), ("electricity", "Bills/Rent"), ("bill", "Bills/Rent"),
+    ("grocer", "Groceries"), ("supermarket", "Groceries"),
+    ("restaurant", "Food"), ("swiggy", "Food"), ("zomato", "Food"), ("cafe", "Food"),
+    ("uber", "Transportation"), ("fuel", "Transportation"), ("metro", "Transportation"),
+    ("netflix", "Entertainment"), ("movie", "Entertainment"), ("spotify", "Entertainment"),
+    ("emi", "Loan/Debt"), ("loan", "Loan/Debt"),
+)
+
+CLASSIFICATION_PATTERN = re.compile("|".join(re.escape(keyword) for keyword, _ in CLASSIFICATION_KEYWORDS))
+CLASSIFICATION_BY_KEYWORD = dict(CLASSIFICATION_KEYWORDS)
+
+OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)")
+
+
+@lru_cache(maxsize=8192)
+def parse_date(value):
+    # Statements repeat the same few hundred dates, so the cache absorbs most strptime calls
+    value = (value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {value!r}")
+
+
+def parse_amount(value):
+    value = (value or "").strip().replace(",", "").replace("₹", "")
+    if value.startswith("(") and value.endswith(")"):
+        value = "-" + value[1:-1]
+    return float(value) if value else 0.0
+
+
+def classify(particular, entry_type):
+    match = CLASSIFICATION_PATTERN.search(particular.lower())
+    return CLASSIFICATION_BY_KEYWORD[match.group()] if match else DEFAULT_CLASSIFICATION
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader, [])]
+        columns = {}
+        for field, aliases in CSV_COLUMNS.items():
+            for index, name in enumerate(header):
+                if name in aliases:
+                    columns[field] = index
+                    break
+        if "date" not in columns or not ({"amount"} <= columns.keys() or {"debit", "credit"} & columns.keys()):
+            raise ValueError("CSV needs a date column and an amount or debit/credit column.")
+        for line_no, values in enumerate(reader, start=2):
+            if not any(values):
+                continue
+            yield line_no, {field: values[index] if index < len(values) else "" for field, index in columns.items()}
+
+
+def read_ofx(path):
+    # OFX 1.x is SGML without closing tags, so collect fields until the next </STMTTRN>
+    with open(path, encoding="utf-8", errors="replace") as f:
+        record = None
+        start_line = 0
+        for line_no, line in enumerate(f, start=1):
+            for closing, tag, value in OFX_TAG.findall(line):
+                tag = tag.upper()
+                if tag == "STMTTRN":
+                    if closing and record is not None:
+                        yield start_line, record
+                        record = None
+                    elif not closing:
+                        record, start_line = {}, line_no
+                elif record is not None and not closing:
+                    record[tag] = value.strip()
+
+
+def normalize_csv_row(raw):
+    if "amount" in raw and raw["amount"].strip():
+        amount = parse_amount(raw["amount"])
+        marker = raw.get("type", "").strip().lower()
+        if marker in ("income", "credit", "cr", "c"):
+            entry_type = "Income"
+        elif marker in ("expense", "debit", "dr", "d"):
+            entry_type = "Expense"
+        else:
+            entry_type = "Income" if amount >= 0 else "Expense"
+    else:
+        if not (raw.get("credit", "").strip() or raw.get("debit", "").strip()):
+            raise ValueError("Missing amount.")
+        credit, debit = parse_amount(raw.get("credit")), parse_amount(raw.get("debit"))
+        entry_type, amount = ("Income", credit) if credit else ("Expense", debit)
+    particular = raw.get("particular", "").strip() or entry_type
+    return Ledger.normalize_transaction({
+        "date": parse_date(raw["date"]),
+        "particular": particular,
+        "amount": abs(amount),
+        "type": entry_type,
+        "classification": raw.get("classification", "").strip() or classify(particular, entry_type),
+    })
+
+
+def normalize_ofx_row(raw):
+    amount = parse_amount(raw.get("TRNAMT"))
+    entry_type = "Income" if amount >= 0 else "Expense"
+    particular = " ".join(part for part in (raw.get("NAME", ""), raw.get("MEMO", "")) if part) or entry_type
+    return Ledger.normalize_transaction({
+        "date": parse_date(raw.get("DTPOSTED", "")[:8]),
+        "particular": particular,
+        "amount": abs(amount),
+        "type": entry_type,
+        "classification": classify(particular, entry_type),
+    })
+
+
+def detect_format(path):
+    return "ofx" if os.path.splitext(path)[1].lower() in (".ofx", ".qfx") else "csv"
+
+
+class ImportStats:
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.rejected_samples = []
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def reject(self, line_no, reason):
+        self.rejected += 1
+        if len(self.rejected_samples) < MAX_REJECTED_SAMPLES:
+            self.rejected_samples.append((line_no, reason))
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return f"Imported {self.imported} rows in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s), rejected {self.rejected}."
+
+
+def normalized_rows(records, normalize, stats):
+    for line_no, raw in records:
+        try:
+            yield normalize(raw)
+        except (ValueError, KeyError) as ex:
+            stats.reject(line_no, str(ex))
+
+
+def import_file(user_id, path, file_format=None, commit_every=COMMIT_EVERY, chunk_size=Ledger.INGEST_CHUNK_SIZE, progress=None):
+    file_format = file_format or detect_format(path)
+    if file_format == "ofx":
+        records, normalize = read_ofx(path), normalize_ofx_row
+    else:
+        records, normalize = read_csv(path), normalize_csv_row
+
+    stats = ImportStats()
+    rows = normalized_rows(records, normalize, stats)
+    while True:
+        # An empty batch would still bump the data version and drop cached reports
+        batch = list(islice(rows, commit_every))
+        if not batch:
+            break
+        stats.imported += Ledger.bulk_insert_transactions(user_id, batch, chunk_size)
+        stats.seconds = time.perf_counter() - stats.started
+        if progress:
+            progress(stats)
+    stats.seconds = time.perf_counter() - stats.started
+    return stats
@@ -1,28 +1,30 @@
 import flet as ft
-import sqlite3
-from Main import get_db_path
-from datetime import date, datetime, timedelta
+import Ledger
+import Maturity
+import UpdateScheduler
+import ViewRegistry
+from datetime import datetime
 
 class InterestCalculator:
-    def __init__(self, page, view: ft.View):
+    def __init__(self, page, view: ft.View, user_id: int):
         self.page = page
         self.view = view
+        self.user_id = user_id
+        self.updates = UpdateScheduler.get_scheduler(page)
+        self.views = ViewRegistry.get_registry(page)
         self.page.window_maximized = True
         self.page.window_full_screen = True
         self.page.scroll = ft.ScrollMode.AUTO
-        self.page.update()
 
-        self.entries = []
+        # Rows are keyed by the rowid once saved and by a negative temporary id before that
+        self.entries = {}
+        self.rows = {}
+        self.hidden_rows = 0
+        self.next_temp_id = -1
+        self.editing_id = None
         self.view.title = "Interest Calculator"
         self.view.bgcolor = "#E3F2FD"
 
-        self.date_picker = ft.DatePicker(
-            on_change=self.date_selected,
-            first_date=date(2000, 1, 1),
-            last_date=date(2025, 12, 31),
-        )
-        self.page.overlay.append(self.date_picker)
-
         field_width = 360
 
         self.deposit_type_dropdown = ft.Dropdown(
@@ -43,7 +45,7 @@ class InterestCalculator:
                 icon="calendar_month",
                 on_click=lambda e: self.open_date_picker()
             ),
-            on_submit=lambda e: self.type_dropdown.focus()
+            on_submit=lambda e: self.amount_field.focus()
         )
 
         self.amount_field = ft.TextField(
@@ -67,6 +69,23 @@ class InterestCalculator:
             options=[ft.dropdown.Option(f"{i} year{'s' if i > 1 else ''}") for i in [1, 2, 3, 5, 10]],
             width=field_width,
             dense=True,
+            on_change=lambda e: self.compounding_dropdown.focus()
+        )
+
+        self.tenure_days_field = ft.TextField(
+            label="Or Tenure in Days",
+            width=field_width,
+            text_align=ft.TextAlign.CENTER,
+            dense=True,
+            on_submit=lambda e: self.compounding_dropdown.focus()
+        )
+
+        self.compounding_dropdown = ft.Dropdown(
+            label="Compounding",
+            options=[ft.dropdown.Option(name) for name in Maturity.COMPOUNDING_PER_YEAR],
+            value="Annual",
+            width=field_width,
+            dense=True,
             on_change=lambda e: self.add_button.focus()
         )
 
@@ -83,7 +102,43 @@ class InterestCalculator:
         )
 
         self.table = self.create_data_table()
-        self.create_table_in_db()
+
+        self.shifts_field = ft.TextField(
+            label="Rate Shifts (bp, comma separated)",
+            value="-50, -25, 0, 25, 50",
+            width=field_width,
+            text_align=ft.TextAlign.CENTER,
+            dense=True
+        )
+
+        self.tenures_field = ft.TextField(
+            label="Tenures in Days (blank = as booked)",
+            width=field_width,
+            text_align=ft.TextAlign.CENTER,
+            dense=True
+        )
+
+        self.sweep_button = ft.ElevatedButton(
+            "Run Sweep", on_click=self.run_sweep, width=130,
+            bgcolor="#1565C0", color="white",
+            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
+        )
+
+        self.export_sweep_button = ft.ElevatedButton(
+            "Export CSV", on_click=self.request_sweep_export, width=130,
+            bgcolor="#0D47A1", color="white", disabled=True,
+            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
+        )
+
+
+        self.sweep_summary = ft.Text("", size=14, color="#0D47A1")
+        self.sweep_table = ft.DataTable(columns=[
+            ft.DataColumn(ft.Text("Rate Shift (bp)", size=14)),
+            ft.DataColumn(ft.Text("Tenure (days)", size=14)),
+            ft.DataColumn(ft.Text("Total Maturity", size=14)),
+            ft.DataColumn(ft.Text("Total Interest", size=14)),
+        ], rows=[])
+        self.sweep_result = None
 
         self.header = ft.Row([
             ft.IconButton(icon="arrow_back", on_click=self.go_back),
@@ -100,6 +155,8 @@ class InterestCalculator:
             self.amount_field,
             self.rate_field,
             self.time_dropdown,
+            self.tenure_days_field,
+            self.compounding_dropdown,
             ft.Row([self.add_button, self.save_button], alignment=ft.MainAxisAlignment.CENTER, spacing=15)
         ], spacing=15, horizontal_alignment=ft.CrossAxisAlignment.CENTER)
 
@@ -113,10 +170,26 @@ class InterestCalculator:
             content=ft.Column([self.table], expand=True, scroll=ft.ScrollMode.AUTO)
         )
 
+        self.sweep_panel = ft.Container(
+            bgcolor="white",
+            padding=15,
+            border_radius=15,
+            width=850,
+            border=ft.border.all(1, "#90CAF9"),
+            content=ft.Column([
+                ft.Text("Scenario Sweep", size=18, weight=ft.FontWeight.BOLD, color="#0D47A1"),
+                ft.Row([self.shifts_field, self.tenures_field], alignment=ft.MainAxisAlignment.CENTER, spacing=15),
+                ft.Row([self.sweep_button, self.export_sweep_button], alignment=ft.MainAxisAlignment.CENTER, spacing=15),
+                self.sweep_summary,
+                ft.Column([self.sweep_table], height=260, scroll=ft.ScrollMode.AUTO)
+            ], spacing=10, horizontal_alignment=ft.CrossAxisAlignment.CENTER)
+        )
+
         self.main_layout = ft.Column([
             self.header,
             self.form_column,
-            self.display_panel
+            self.display_panel,
+            self.sweep_panel
         ], spacing=15,
            scroll=ft.ScrollMode.AUTO,
            expand=True,
@@ -125,39 +198,26 @@ class InterestCalculator:
         self.view.controls.clear()
         self.view.controls.append(self.main_layout)
 
+    def reset(self):
+        # Called when the screen is shown again; the entries table and sweep results are kept
+        self.finish_editing()
+        self.reset_fields()
+
+    @UpdateScheduler.handler
     def open_date_picker(self):
-        self.date_picker.open = True
-        self.page.update()
+        self.views.pick_date(self.date_selected)
 
-    def date_selected(self, e):
-        if self.date_picker.value:
-            picked = self.date_picker.value
-            self.date_field.value = picked.strftime("%d/%m/%Y")
-            self.type_dropdown.focus()
-            self.page.update()
+    @UpdateScheduler.handler
+    def date_selected(self, picked):
+        self.date_field.value = picked.strftime("%d/%m/%Y")
+        self.amount_field.focus()
+        self.updates.request(self.date_field)
 
+    @UpdateScheduler.handler
     def go_back(self, e):
         if len(self.page.views) > 1:
             self.page.views.pop()
-            self.page.update()
-
-    def create_table_in_db(self):
-        conn = sqlite3.connect(get_db_path())
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS interest_calculations (
-                id INTEGER PRIMARY KEY,
-                deposit_date TEXT,
-                maturity_date TEXT,
-                amount REAL,
-                interest_rate REAL,
-                time_of_maturity TEXT,
-                maturity_amount REAL,
-                deposit_type TEXT
-            )
-        ''')
-        conn.commit()
-        conn.close()
+            self.updates.request()
 
     def create_data_table(self):
         return ft.DataTable(columns=[
@@ -171,100 +231,225 @@ class InterestCalculator:
             ft.DataColumn(ft.Text("Actions", size=14)),
         ], rows=[])
 
-    def calculate_maturity(self, amount, rate, years, is_cumulative):
-        return amount * (1 + rate / 100) ** years if is_cumulative else amount + (amount * rate * years / 100)
-
+    @UpdateScheduler.handler(burst=True)
     def add_entry(self, e):
         try:
             deposit_date_str = self.date_field.value
             deposit_date = datetime.strptime(deposit_date_str, "%d/%m/%Y")
             amount = float(self.amount_field.value)
             rate = float(self.rate_field.value)
-            years = int(self.time_dropdown.value.split()[0])
             deposit_type = self.deposit_type_dropdown.value
-
-            maturity_date = deposit_date + timedelta(days=365 * years)
-            maturity_amount = self.calculate_maturity(amount, rate, years, deposit_type == "Cumulative")
+            compounding = self.compounding_dropdown.value or "Annual"
+            if self.tenure_days_field.value:
+                tenure_days = int(self.tenure_days_field.value)
+                time_label = f"{tenure_days} days"
+            else:
+                years = int(self.time_dropdown.value.split()[0])
+                tenure_days = years * Maturity.DAYS_PER_YEAR
+                time_label = f"{years} year(s)"
+
+            amounts, dates = Maturity.evaluate(
+                [amount], [rate], [tenure_days], [compounding], [deposit_type],
+                deposit_dates=[deposit_date.strftime("%Y-%m-%d")]
+            )
+            maturity_amount = float(amounts[0])
+            maturity_date = dates[0].item()
 
             row_data = {
                 "deposit_date": deposit_date.strftime("%Y-%m-%d"),
                 "maturity_date": maturity_date.strftime("%d/%m/%Y"),  # Keep as is for display
                 "amount": amount,
                 "rate": rate,
-                "time": f"{years} year(s)",
+                "time": time_label,
                 "maturity_amount": maturity_amount,
-                "type": deposit_type
+                "type": deposit_type,
+                "tenure_days": tenure_days,
+                "compounding": Maturity.COMPOUNDING_PER_YEAR[compounding]
             }
 
 
-            delete_icon = ft.IconButton(
-                icon="delete",
-                on_click=lambda e, r=row_data: self.delete_entry(r)
-            )
-
-            self.table.rows.append(ft.DataRow(cells=[
-                ft.DataCell(ft.Text(row_data["deposit_date"], size=14)),
-                ft.DataCell(ft.Text(row_data["maturity_date"], size=14)),
-                ft.DataCell(ft.Text(str(row_data["amount"]), size=14)),
-                ft.DataCell(ft.Text(str(row_data["rate"]), size=14)),
-                ft.DataCell(ft.Text(row_data["time"], size=14)),
-                ft.DataCell(ft.Text(f"{row_data['maturity_amount']:.2f}", size=14)),
-                ft.DataCell(ft.Text(row_data["type"], size=14)),
-                ft.DataCell(delete_icon),
-            ]))
-
-            self.entries.append(row_data)
+            if self.editing_id is None:
+                row_id = self.next_temp_id
+                self.next_temp_id -= 1
+                row = ft.DataRow(cells=self.deposit_cells(row_id, row_data), data=row_data)
+                self.table.rows.append(row)
+                self.rows[row_id] = row
+                self.entries[row_id] = row_data
+            else:
+                row_id = self.editing_id
+                if row_id > 0:
+                    Ledger.update_deposit(self.user_id, row_id, row_data)
+                else:
+                    self.entries[row_id] = row_data
+                row = self.rows[row_id]
+                row.cells = self.deposit_cells(row_id, row_data)
+                row.data = row_data
+            self.finish_editing()
             self.clear_fields()
-            self.page.update()
+            self.updates.request(self.table, self.form_column)
 
         except Exception as ex:
             self.show_snack_bar(f"Error: {str(ex)}", "red")
 
+    def deposit_cells(self, row_id, row_data):
+        return [
+            ft.DataCell(ft.Text(row_data["deposit_date"], size=14)),
+            ft.DataCell(ft.Text(row_data["maturity_date"], size=14)),
+            ft.DataCell(ft.Text(str(row_data["amount"]), size=14)),
+            ft.DataCell(ft.Text(str(row_data["rate"]), size=14)),
+            ft.DataCell(ft.Text(row_data["time"], size=14)),
+            ft.DataCell(ft.Text(f"{row_data['maturity_amount']:.2f}", size=14)),
+            ft.DataCell(ft.Text(row_data["type"], size=14)),
+            ft.DataCell(ft.Row([
+                ft.IconButton(icon="edit", on_click=lambda e, i=row_id: self.edit_entry(i)),
+                ft.IconButton(icon="delete", on_click=lambda e, i=row_id: self.delete_entry(i)),
+            ], spacing=0)),
+        ]
+
+    @UpdateScheduler.handler
+    def edit_entry(self, row_id):
+        # Load an unsaved or saved deposit into the form; Add then writes it back by id
+        row = self.rows.get(row_id)
+        if row is None:
+            return
+        row_data = row.data
+        self.deposit_type_dropdown.value = row_data["type"]
+        self.date_field.value = datetime.strptime(row_data["deposit_date"], "%Y-%m-%d").strftime("%d/%m/%Y")
+        self.amount_field.value = str(row_data["amount"])
+        self.rate_field.value = str(row_data["rate"])
+        years, days = divmod(row_data["tenure_days"], Maturity.DAYS_PER_YEAR)
+        if row_data["time"].endswith("days") or days:
+            self.time_dropdown.value = ""
+            self.tenure_days_field.value = str(row_data["tenure_days"])
+        else:
+            self.time_dropdown.value = f"{years} year{'s' if years > 1 else ''}"
+            self.tenure_days_field.value = ""
+        self.compounding_dropdown.value = next(
+            (name for name, per_year in Maturity.COMPOUNDING_PER_YEAR.items() if per_year == row_data["compounding"]), "Annual")
+        self.editing_id = row_id
+        self.add_button.text = "Update"
+        self.amount_field.focus()
+        self.updates.request(self.form_column)
+
+    def finish_editing(self):
+        self.editing_id = None
+        self.add_button.text = "Add Entry"
+
     def clear_fields(self):
+        self.reset_fields()
+        self.deposit_type_dropdown.focus()
+
+    def reset_fields(self):
         self.date_field.value = ""
         self.amount_field.value = ""
         self.rate_field.value = ""
         self.time_dropdown.value = ""
+        self.tenure_days_field.value = ""
+        self.compounding_dropdown.value = "Annual"
         self.deposit_type_dropdown.value = ""
-        self.deposit_type_dropdown.focus()
-
-    def delete_entry(self, entry):
-        self.table.rows = [row for row in self.table.rows if not (
-            row.cells[0].content.value == entry["deposit_date"]
-        )]
-        self.entries = [e for e in self.entries if e["deposit_date"] != entry["deposit_date"]]
-        self.page.update()
 
+    @UpdateScheduler.handler
+    def delete_entry(self, row_id):
+        if row_id > 0:
+            try:
+                Ledger.delete_deposits(self.user_id, [row_id])
+            except Exception as ex:
+                self.show_snack_bar(f"Database Error: {str(ex)}", "red")
+                return
+        if row_id == self.editing_id:
+            self.finish_editing()
+            self.reset_fields()
+            self.updates.request(self.form_column)
+        self.entries.pop(row_id, None)
+        row = self.rows.pop(row_id, None)
+        if row is not None:
+            # Hide in place and compact once most of the table is dead, keeping deletes constant time
+            row.visible = False
+            self.hidden_rows += 1
+            if self.hidden_rows > len(self.rows):
+                self.table.rows = list(self.rows.values())
+                self.hidden_rows = 0
+        self.updates.request(self.table)
+
+    @UpdateScheduler.handler
     def save_to_database(self, e):
         if not self.entries:
             self.show_snack_bar("No entries to save.", "red")
             return
 
         try:
-            conn = sqlite3.connect(get_db_path())
-            cursor = conn.cursor()
-            for entry in self.entries:
-                cursor.execute('''
-                    INSERT INTO interest_calculations
-                    (deposit_date, maturity_date, amount, interest_rate, time_of_maturity, maturity_amount, deposit_type)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    entry["deposit_date"],
-                    entry["maturity_date"],
-                    entry["amount"],
-                    entry["rate"],
-                    entry["time"],
-                    entry["maturity_amount"],
-                    entry["type"]
-                ))
-            conn.commit()
-            conn.close()
+            saved = Ledger.ingest_deposits(self.user_id, self.entries.values())
+            # Saved rows stay on screen, now keyed by rowid so edits and deletes go to the stored deposit
+            for temp_id, row_id in zip(list(self.entries), saved):
+                row = self.rows.pop(temp_id)
+                row.cells = self.deposit_cells(row_id, row.data)
+                self.rows[row_id] = row
+                if self.editing_id == temp_id:
+                    self.editing_id = row_id
             self.entries.clear()
             self.show_snack_bar("Saved successfully.", "green")
         except Exception as ex:
             self.show_snack_bar(f"Database Error: {str(ex)}", "red")
 
+    @UpdateScheduler.handler
+    def run_sweep(self, e):
+        try:
+            shifts = Maturity.parse_grid(self.shifts_field.value)
+            tenures = Maturity.parse_grid(self.tenures_field.value, int) if self.tenures_field.value.strip() else None
+        except ValueError as ex:
+            self.show_snack_bar(f"Invalid grid: {str(ex)}", "red")
+            return
+
+        portfolio = Maturity.load_portfolio(self.user_id)
+        if not len(portfolio["principal"]):
+            self.show_snack_bar("No saved deposits to sweep.", "red")
+            return
+
+        self.sweep_button.disabled = True
+        self.sweep_summary.value = "Running sweep..."
+        # Show progress before the sweep blocks this handler
+        self.updates.request(self.sweep_button, self.sweep_summary)
+        self.updates.flush()
+        try:
+            result = Maturity.sweep(portfolio, shifts, tenures)
+        except Exception as ex:
+            self.show_snack_bar(f"Sweep failed: {str(ex)}", "red")
+            return
+        finally:
+            self.sweep_button.disabled = False
+
+        self.sweep_result = result
+        self.sweep_summary.value = (
+            f"{result['deposits']} deposits · {result['cells']:,} scenarios · "
+            f"principal ₹ {result['principal']:,.2f}"
+        )
+        self.sweep_table.rows = [
+            ft.DataRow(cells=[
+                ft.DataCell(ft.Text(f"{shift:+g}", size=14)),
+                ft.DataCell(ft.Text(str(tenure), size=14)),
+                ft.DataCell(ft.Text(f"{maturity:,.2f}", size=14)),
+                ft.DataCell(ft.Text(f"{interest:,.2f}", size=14)),
+            ])
+            for shift, tenure, maturity, interest in Maturity.sweep_rows(result)
+        ]
+        self.export_sweep_button.disabled = False
+        self.updates.request(self.sweep_button, self.sweep_summary, self.sweep_table, self.export_sweep_button)
+
+    def request_sweep_export(self, e):
+        if self.sweep_result is not None:
+            self.views.save_file(self.sweep_export_selected, dialog_title="Export Sweep As", file_name="scenario_sweep.csv")
+
+    @UpdateScheduler.handler
+    def sweep_export_selected(self, e: ft.FilePickerResultEvent):
+        if not e.path:
+            return
+        try:
+            Maturity.export_sweep_csv(self.sweep_result, e.path)
+            self.show_snack_bar(f"Sweep exported to: {e.path}", "green")
+        except Exception as ex:
+            self.show_snack_bar(f"Export failed: {str(ex)}", "red")
+
     def show_snack_bar(self, message, color):
         self.page.snack_bar = ft.SnackBar(ft.Text(message, size=14), bgcolor=color)
         self.page.snack_bar.open = True
-        self.page.update()
\ No newline at end of file
+        self.updates.request()
\ No newline at end of file
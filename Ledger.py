@@ -0,0 +1,550 @@
+import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from itertools import islice
+import Database
+
+INGEST_CHUNK_SIZE = 5000
+FETCH_BATCH_SIZE = 1000
+SEARCH_PAGE_SIZE = 25
+HISTORY_PAGE_SIZE = 100
+# Ids per IN (...) list, well under SQLite's host parameter limit
+ID_BATCH_SIZE = 500
+TRANSACTION_TYPES = ("Income", "Expense")
+# Fixed ids, so triggers and aggregates can test type_id without a join
+TYPE_IDS = {"Income": 1, "Expense": 2}
+DEFAULT_CLASSIFICATIONS = (
+    "Food", "Clothes", "Bills/Rent", "Larger Purchases", "Transportation",
+    "Groceries", "Entertainment", "Salary", "Loan/Debt",
+)
+DEPOSIT_TYPES = ("Cumulative", "Non-Cumulative")
+
+TRANSACTIONS_IN_RANGE = '''
+    SELECT t.date, t.particular, t.amount, ty.name, c.name
+    FROM transactions t
+    LEFT JOIN transaction_types ty ON ty.id = t.type_id
+    LEFT JOIN classifications c ON c.id = t.classification_id
+    WHERE t.user_id = ? AND t.date >= ? AND t.date < ?
+    ORDER BY t.date'''
+# A category name resolves to the user's own row or a built-in; names are only
+# unique per owner
+INSERT_TRANSACTION = '''
+    INSERT INTO transactions (date, particular, amount, type_id, classification_id, user_id)
+    VALUES (?1, ?2, ?3, (SELECT id FROM transaction_types WHERE name = ?4),
+            (SELECT id FROM classifications WHERE name = ?5 AND (user_id IS NULL OR user_id = ?6)), ?6)'''
+UPDATE_TRANSACTION = '''
+    UPDATE transactions SET date = ?1, particular = ?2, amount = ?3,
+        type_id = (SELECT id FROM transaction_types WHERE name = ?4),
+        classification_id = (SELECT id FROM classifications WHERE name = ?5 AND (user_id IS NULL OR user_id = ?7))
+    WHERE id = ?6 AND user_id = ?7'''
+TRANSACTIONS_BY_ID = '''
+    SELECT t.date, t.particular, t.amount, ty.name, c.name
+    FROM transactions t
+    LEFT JOIN transaction_types ty ON ty.id = t.type_id
+    LEFT JOIN classifications c ON c.id = t.classification_id
+    WHERE t.user_id = ? AND t.id IN ({})'''
+INSERT_DEPOSIT = """
+    INSERT INTO interest_calculations
+    (deposit_date, maturity_date, amount, interest_rate, time_of_maturity, maturity_amount, deposit_type,
+     tenure_days, compounding, user_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+UPDATE_DEPOSIT = """
+    UPDATE interest_calculations SET deposit_date = ?, maturity_date = ?, amount = ?, interest_rate = ?,
+        time_of_maturity = ?, maturity_amount = ?, deposit_type = ?, tenure_days = ?, compounding = ?
+    WHERE id = ? AND user_id = ?"""
+ADD_CLASSIFICATION = '''
+    INSERT INTO classifications (name, user_id) SELECT ?1, ?2
+    WHERE NOT EXISTS (SELECT 1 FROM classifications WHERE name = ?1 AND (user_id IS NULL OR user_id = ?2))'''
+INTEREST_IN_RANGE = '''
+    SELECT deposit_date, maturity_date, deposit_type, amount, interest_rate, time_of_maturity, maturity_amount
+    FROM interest_calculations
+    WHERE user_id = ? AND deposit_date >= ? AND deposit_date < ?
+    ORDER BY deposit_date, id'''
+
+
+def month_range(day):
+    start = day.replace(day=1)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+def year_range(day):
+    start = day.replace(month=1, day=1)
+    end = start.replace(year=start.year + 1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+def custom_range(first_day, last_day):
+    # Inclusive on both ends for the user, half-open for the query
+    if last_day < first_day:
+        raise ValueError("End date is before start date.")
+    return first_day.strftime("%Y-%m-%d"), (last_day + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def normalize_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.datetime.strptime(value, "%d/%m/%Y").strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date: {value}")
+
+
+def to_paise(value):
+    # Money is stored as integer paise. Going through str() converts a float
+    # such as 0.1 as the 0.1 that was typed rather than its binary expansion.
+    try:
+        paise = (Decimal(str(value).strip().replace(",", "")) * 100).quantize(Decimal(1), ROUND_HALF_UP)
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid amount: {value}")
+    return int(paise)
+
+
+def format_money(paise):
+    rupees, rest = divmod(abs(int(paise)), 100)
+    return f"{'-' if paise < 0 else ''}{rupees}.{rest:02d}"
+
+
+def normalize_transaction(entry):
+    particular = (entry.get("particular") or "").strip()
+    if not particular:
+        raise ValueError("Particular is required.")
+    if entry.get("type") not in TRANSACTION_TYPES:
+        raise ValueError(f"Invalid type: {entry.get('type')}")
+    if not entry.get("classification"):
+        raise ValueError("Classification is required.")
+    amount = to_paise(entry.get("amount"))
+    return (normalize_date(entry.get("date")), particular, amount, entry["type"], entry["classification"])
+
+
+def normalize_deposit(entry):
+    if entry.get("type") not in DEPOSIT_TYPES:
+        raise ValueError(f"Invalid deposit type: {entry.get('type')}")
+    try:
+        amount = to_paise(entry.get("amount"))
+        rate = float(entry.get("rate"))
+        maturity_amount = to_paise(entry.get("maturity_amount"))
+        tenure_days = int(entry.get("tenure_days"))
+        compounding = int(entry.get("compounding", 1))
+    except (TypeError, ValueError):
+        raise ValueError("Amount, rate, tenure and maturity amount must be numbers.")
+    return (
+        normalize_date(entry.get("deposit_date")),
+        entry.get("maturity_date"),
+        amount,
+        rate,
+        entry.get("time"),
+        maturity_amount,
+        entry["type"],
+        tenure_days,
+        compounding,
+    )
+
+
+_change_listeners = []
+
+
+def add_change_listener(listener):
+    # listener(user_id, {date: (net paise, row count)}) runs after rows are written in this process
+    _change_listeners.append(listener)
+
+
+def notify_change(user_id, deltas):
+    for listener in list(_change_listeners):
+        listener(user_id, deltas)
+
+
+def daily_deltas(rows, deltas=None, sign=1):
+    # rows are normalized (date, particular, paise, type, classification) tuples; sign=-1 for removed rows
+    deltas = {} if deltas is None else deltas
+    for date, _, amount, entry_type, _ in rows:
+        net, count = deltas.get(date, (0, 0))
+        deltas[date] = (net + sign * (amount if entry_type == "Income" else -amount), count + sign)
+    return deltas
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _ingest(sql, rows, chunk_size):
+    count = 0
+    with Database.writer() as conn:
+        for chunk in chunked(rows, chunk_size):
+            conn.executemany(sql, chunk)
+            count += len(chunk)
+    return count
+
+
+def insert_transactions(user_id, rows, chunk_size=INGEST_CHUNK_SIZE):
+    count = 0
+    deltas = {} if _change_listeners else None
+    with Database.writer() as conn:
+        for chunk in chunked(rows, chunk_size):
+            # Classifications not seen before become the inserting user's own categories
+            conn.executemany(ADD_CLASSIFICATION, {(row[4], user_id) for row in chunk})
+            conn.executemany(INSERT_TRANSACTION, [row + (user_id,) for row in chunk])
+            count += len(chunk)
+            if deltas is not None:
+                daily_deltas(chunk, deltas)
+    if deltas:
+        notify_change(user_id, deltas)
+    return count
+
+
+def bulk_insert_transactions(user_id, rows, chunk_size=INGEST_CHUNK_SIZE):
+    with Database.writer() as conn:
+        first_new_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+        conn.execute("INSERT INTO bulk_load (user_id) VALUES (?)", (user_id,))
+        count = insert_transactions(user_id, rows, chunk_size)
+        conn.execute('''
+            INSERT INTO ledger_summary (user_id, income, expense, row_count)
+            SELECT user_id,
+                   COALESCE(SUM(CASE WHEN type_id = ? THEN amount ELSE 0 END), 0),
+                   COALESCE(SUM(CASE WHEN type_id = ? THEN amount ELSE 0 END), 0),
+                   COUNT(*)
+            FROM transactions WHERE id > ? GROUP BY user_id
+            ON CONFLICT (user_id) DO UPDATE SET
+                income = income + excluded.income,
+                expense = expense + excluded.expense,
+                row_count = row_count + excluded.row_count
+        ''', (TYPE_IDS["Income"], TYPE_IDS["Expense"], first_new_id))
+        conn.execute('''
+            INSERT INTO monthly_rollup (user_id, year, month, type, classification, total, count)
+            SELECT t.user_id, CAST(substr(t.date, 1, 4) AS INTEGER), CAST(substr(t.date, 6, 2) AS INTEGER),
+                   ty.name, COALESCE(c.name, ''), SUM(t.amount), COUNT(*)
+            FROM transactions t
+            JOIN transaction_types ty ON ty.id = t.type_id
+            LEFT JOIN classifications c ON c.id = t.classification_id
+            WHERE t.id > ? GROUP BY 1, 2, 3, 4, 5
+            ON CONFLICT (user_id, year, month, type, classification) DO UPDATE SET
+                total = total + excluded.total,
+                count = count + excluded.count
+        ''', (first_new_id,))
+        conn.execute('''
+            INSERT INTO transactions_fts (rowid, particular, owner)
+            SELECT id, particular, 'u' || user_id FROM transactions WHERE id > ?
+        ''', (first_new_id,))
+        conn.execute("DELETE FROM bulk_load")
+        conn.execute("UPDATE data_version SET version = version + 1 WHERE name = 'transactions'")
+    return count
+
+
+def ingest_transactions(user_id, entries, chunk_size=INGEST_CHUNK_SIZE):
+    return insert_transactions(user_id, (normalize_transaction(entry) for entry in entries), chunk_size)
+
+
+def ingest_deposits(user_id, entries, chunk_size=INGEST_CHUNK_SIZE):
+    # Returns the new rowids in entry order. The writer lock keeps other inserts
+    # out, so rows without an explicit id take the next ids after the current max.
+    with Database.writer() as conn:
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM interest_calculations").fetchone()[0]
+        count = _ingest(INSERT_DEPOSIT, (normalize_deposit(entry) + (user_id,) for entry in entries), chunk_size)
+    return range(last_id + 1, last_id + 1 + count)
+
+
+def update_deposit(user_id, deposit_id, entry):
+    row = normalize_deposit(entry)
+    with Database.writer() as conn:
+        if not conn.execute(UPDATE_DEPOSIT, row + (deposit_id, user_id)).rowcount:
+            raise ValueError("That deposit no longer exists.")
+    return row
+
+
+def delete_deposits(user_id, ids):
+    count = 0
+    with Database.writer() as conn:
+        for chunk in chunked(ids, ID_BATCH_SIZE):
+            marks = ", ".join("?" * len(chunk))
+            count += conn.execute(f"DELETE FROM interest_calculations WHERE user_id = ? AND id IN ({marks})", [user_id] + chunk).rowcount
+    return count
+
+
+def delete_transactions(user_id, ids):
+    # The removed rows are read back first so change listeners can take them out of their own totals
+    removed = []
+    with Database.writer() as conn:
+        for chunk in chunked(ids, ID_BATCH_SIZE):
+            marks = ", ".join("?" * len(chunk))
+            removed += conn.execute(TRANSACTIONS_BY_ID.format(marks), [user_id] + chunk).fetchall()
+            conn.execute(f"DELETE FROM transactions WHERE user_id = ? AND id IN ({marks})", [user_id] + chunk)
+    if removed and _change_listeners:
+        notify_change(user_id, daily_deltas(removed, sign=-1))
+    return len(removed)
+
+
+def update_transaction(user_id, transaction_id, entry):
+    row = normalize_transaction(entry)
+    with Database.writer() as conn:
+        old = conn.execute(TRANSACTIONS_BY_ID.format("?"), (user_id, transaction_id)).fetchall()
+        if not old:
+            raise ValueError("That entry no longer exists.")
+        conn.execute(ADD_CLASSIFICATION, (row[4], user_id))
+        conn.execute(UPDATE_TRANSACTION, row + (transaction_id, user_id))
+    if _change_listeners:
+        notify_change(user_id, daily_deltas([row], daily_deltas(old, sign=-1)))
+    return row
+
+
+def compute_balances(conn):
+    rows = conn.execute('''
+        SELECT user_id,
+               COALESCE(SUM(CASE WHEN type_id = ? THEN amount ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN type_id = ? THEN amount ELSE 0 END), 0),
+               COUNT(*)
+        FROM transactions
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+    ''', (TYPE_IDS["Income"], TYPE_IDS["Expense"]))
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def get_balance(user_id):
+    with Database.reader() as conn:
+        row = conn.execute("SELECT income - expense FROM ledger_summary WHERE user_id = ?", (user_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def rebuild_balance():
+    with Database.writer() as conn:
+        balances = compute_balances(conn)
+        conn.execute("DELETE FROM ledger_summary")
+        conn.executemany(
+            "INSERT INTO ledger_summary (user_id, income, expense, row_count) VALUES (?, ?, ?, ?)",
+            [(user_id,) + totals for user_id, totals in balances.items()],
+        )
+    return {user_id: income - expense for user_id, (income, expense, _) in balances.items()}
+
+
+def verify_balance():
+    with Database.reader() as conn:
+        stored = {row[0]: tuple(row[1:]) for row in conn.execute("SELECT user_id, income, expense, row_count FROM ledger_summary WHERE row_count > 0")}
+        actual = compute_balances(conn)
+    mismatched = {}
+    for user_id in set(stored) | set(actual):
+        have, want = stored.get(user_id), actual.get(user_id)
+        if have != want:
+            mismatched[user_id] = (have, want)
+    return mismatched
+
+
+def rebuild_rollup():
+    with Database.writer() as conn:
+        conn.execute("DELETE FROM monthly_rollup")
+        conn.execute('''
+            INSERT INTO monthly_rollup (user_id, year, month, type, classification, total, count)
+            SELECT t.user_id, CAST(substr(t.date, 1, 4) AS INTEGER), CAST(substr(t.date, 6, 2) AS INTEGER),
+                   ty.name, COALESCE(c.name, ''), SUM(t.amount), COUNT(*)
+            FROM transactions t
+            JOIN transaction_types ty ON ty.id = t.type_id
+            LEFT JOIN classifications c ON c.id = t.classification_id
+            WHERE t.user_id IS NOT NULL AND t.date IS NOT NULL
+            GROUP BY 1, 2, 3, 4, 5
+        ''')
+        conn.execute('''
+            INSERT INTO monthly_rollup (user_id, year, month, type, classification, total, count)
+            SELECT user_id, CAST(substr(deposit_date, 1, 4) AS INTEGER), CAST(substr(deposit_date, 6, 2) AS INTEGER),
+                   'Interest', COALESCE(deposit_type, ''), SUM(maturity_amount), COUNT(*)
+            FROM interest_calculations
+            WHERE user_id IS NOT NULL AND deposit_date IS NOT NULL
+            GROUP BY 1, 2, 3, 4, 5
+        ''')
+        return conn.execute("SELECT COUNT(*) FROM monthly_rollup").fetchone()[0]
+
+
+def list_classifications(user_id):
+    # Built-ins, the user's own categories and anything already in their ledger
+    with Database.reader() as conn:
+        rows = conn.execute('''
+            SELECT name FROM classifications WHERE user_id IS NULL OR user_id = ?
+            UNION
+            SELECT classification FROM monthly_rollup
+            WHERE user_id = ? AND type != 'Interest' AND classification != ''
+        ''', (user_id, user_id)).fetchall()
+    names = {row[0] for row in rows}
+    return [name for name in DEFAULT_CLASSIFICATIONS if name in names] + sorted(names - set(DEFAULT_CLASSIFICATIONS))
+
+
+def add_classification(user_id, name):
+    name = (name or "").strip()
+    if not name:
+        raise ValueError("Category name is required.")
+    with Database.writer() as conn:
+        conn.execute(ADD_CLASSIFICATION, (name, user_id))
+    return name
+
+
+def fts_query(user_id, text):
+    # Each word becomes a quoted prefix term, so user input can never be read as
+    # FTS5 syntax; the owner term keeps other users' rows out of the match
+    terms = [word.replace('"', '""') for word in (text or "").split()]
+    if not terms:
+        raise ValueError("Enter something to search for.")
+    words = " ".join(f'"{term}"*' for term in terms)
+    return f'owner : "u{int(user_id)}" AND particular : ({words})'
+
+
+def search_transactions(user_id, text, start=None, end=None, classification=None, before=None, page_size=SEARCH_PAGE_SIZE):
+    # Newest entries first, paged by id: FTS5 walks its matches in rowid order and
+    # stops once a page is full, so no page ranks or sorts the whole match set.
+    # before is the id of the last row already shown.
+    filters, params = "", [fts_query(user_id, text)]
+    if before is not None:
+        filters += " AND f.rowid < ?"
+        params.append(before)
+    if start is not None:
+        filters += " AND t.date >= ?"
+        params.append(start)
+    if end is not None:
+        filters += " AND t.date < ?"
+        params.append(end)
+    if classification is not None:
+        filters += " AND c.name = ?"
+        params.append(classification)
+    # One extra row tells the caller whether there is a next page without counting every match
+    params.append(page_size + 1)
+    with Database.reader() as conn:
+        if start is not None or end is not None:
+            # Bound the walk to the ids dated in range, so a narrow or empty window
+            # does not step through every newer match first
+            low, high = conn.execute('''
+                SELECT MIN(id), MAX(id) FROM transactions INDEXED BY idx_transactions_user_history
+                WHERE user_id = ? AND date >= ? AND date < ?
+            ''', (user_id, start or "", end or "9999")).fetchone()
+            if low is None:
+                return [], False
+            filters += " AND f.rowid BETWEEN ? AND ?"
+            params[-1:-1] = [low, high]
+        rows = conn.execute(f'''
+            SELECT t.id, t.date, t.particular, t.amount, ty.name, c.name
+            FROM transactions_fts f
+            JOIN transactions t ON t.id = f.rowid
+            LEFT JOIN transaction_types ty ON ty.id = t.type_id
+            LEFT JOIN classifications c ON c.id = t.classification_id
+            WHERE transactions_fts MATCH ?{filters}
+            ORDER BY f.rowid DESC
+            LIMIT ?
+        ''', params).fetchall()
+    return rows[:page_size], len(rows) > page_size
+
+
+def fetch_history(user_id, before=None, after=None, limit=HISTORY_PAGE_SIZE):
+    # Keyset paging over (date, id), newest first. before/after are the (date, id)
+    # of the last/first row already shown; pages never use OFFSET, so any depth costs the same.
+    if after is not None:
+        condition, order, params = "AND (t.date, t.id) > (?, ?)", "ASC", (user_id,) + tuple(after)
+    elif before is not None:
+        condition, order, params = "AND (t.date, t.id) < (?, ?)", "DESC", (user_id,) + tuple(before)
+    else:
+        condition, order, params = "", "DESC", (user_id,)
+    with Database.reader() as conn:
+        rows = conn.execute(f'''
+            SELECT t.id, t.date, t.particular, t.amount, ty.name, c.name
+            FROM transactions t INDEXED BY idx_transactions_user_history
+            LEFT JOIN transaction_types ty ON ty.id = t.type_id
+            LEFT JOIN classifications c ON c.id = t.classification_id
+            WHERE t.user_id = ? {condition}
+            ORDER BY t.date {order}, t.id {order}
+            LIMIT ?
+        ''', params + (limit,)).fetchall()
+    return rows[::-1] if after is not None else rows
+
+
+def fetch_breakdown(user_id, year, month=None):
+    # Monthly reports keep counting the whole year's deposits as interest
+    period = "" if month is None else "AND (month = ? OR type = 'Interest')"
+    params = (user_id, year) if month is None else (user_id, year, month)
+    with Database.reader() as conn:
+        return conn.execute(f'''
+            SELECT type, classification, SUM(total), SUM(count)
+            FROM monthly_rollup
+            WHERE user_id = ? AND year = ? {period}
+            GROUP BY type, classification
+            ORDER BY type, SUM(total) DESC
+        ''', params).fetchall()
+
+
+def fetch_series(user_id, first_year, last_year, by="month"):
+    # In a series each month carries the deposits booked in that month, so the months add up to the year
+    group = "year, month" if by == "month" else "year"
+    with Database.reader() as conn:
+        rows = conn.execute(f'''
+            SELECT {group},
+                   SUM(CASE WHEN type = 'Income' THEN total ELSE 0 END),
+                   SUM(CASE WHEN type = 'Expense' THEN total ELSE 0 END),
+                   SUM(CASE WHEN type = 'Interest' THEN total ELSE 0 END)
+            FROM monthly_rollup
+            WHERE user_id = ? AND year BETWEEN ? AND ?
+            GROUP BY {group}
+        ''', (user_id, first_year, last_year)).fetchall()
+
+    found = {tuple(row[:-3]): row[-3:] for row in rows}
+    if by == "month":
+        keys = [(year, month) for year in range(first_year, last_year + 1) for month in range(1, 13)]
+    else:
+        keys = [(year,) for year in range(first_year, last_year + 1)]
+    series = []
+    for key in keys:
+        income, expense, interest = found.get(key, (0, 0, 0))
+        label = datetime.date(key[0], key[1], 1).strftime("%b %Y") if by == "month" else str(key[0])
+        series.append((label, income, expense, interest, income - expense + interest))
+    return series
+
+
+def count_transactions(user_id, start, end):
+    with Database.reader() as conn:
+        sql = "SELECT COUNT(*) FROM transactions WHERE user_id = ? AND date >= ? AND date < ?"
+        return conn.execute(sql, (user_id, start, end)).fetchone()[0]
+
+
+def count_interest(user_id, start, end):
+    with Database.reader() as conn:
+        sql = "SELECT COUNT(*) FROM interest_calculations WHERE user_id = ? AND deposit_date >= ? AND deposit_date < ?"
+        return conn.execute(sql, (user_id, start, end)).fetchone()[0]
+
+
+def iter_rows(sql, params, batch_size=FETCH_BATCH_SIZE):
+    with Database.reader() as conn:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+
+
+def iter_transactions(user_id, start, end):
+    return iter_rows(TRANSACTIONS_IN_RANGE, (user_id, start, end))
+
+
+def iter_interest(user_id, start, end):
+    return iter_rows(INTEREST_IN_RANGE, (user_id, start, end))
+
+
+def query_plan(sql, params=()):
+    with Database.reader() as conn:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def check_query_plans():
+    # Every date-filtered lookup must be answered by an index search, never a table scan
+    start, end = month_range(datetime.date.today())
+    results = []
+    for name, sql in (("transactions", TRANSACTIONS_IN_RANGE), ("interest_calculations", INTEREST_IN_RANGE)):
+        plan = query_plan(sql, (0, start, end))
+        uses_index = any("USING" in step and "INDEX" in step for step in plan) and not any(step.startswith("SCAN") for step in plan)
+        results.append((name, plan, uses_index))
+    return results
@@ -1,31 +1,23 @@
 import flet as ft
-import sqlite3
+import Database
+import UpdateScheduler
+import ViewRegistry
 import hashlib
+import importlib
+import multiprocessing
 import ctypes
 import os
 import sys
+import threading
+import time
+from AppPaths import get_credentials_path
+
+# Screen modules (and through them NumPy and ReportLab) loaded in the background once the login screen is up
+PREWARM_MODULES = ("TransactionRecord", "InterestCalculator", "BudgetReport", "DownloadPDF")
 
 if sys.platform == "win32":
     ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID("com.yourname.personalfinance.1.0")
 
-def get_app_data_path():
-    base = os.getenv("LOCALAPPDATA") or os.path.expanduser("~/.myapp")
-    path = os.path.join(base, "PersonalFinance")
-    os.makedirs(path, exist_ok=True)
-    return path
-
-def get_credentials_path():
-    base = get_app_data_path()
-    path = os.path.join(base, "credentials.txt")
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    return path
-
-def get_db_path():
-    base = get_app_data_path()
-    path = os.path.join(base, "database.db")
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    return path
-
 def hide_file_windows(filepath):
     if sys.platform == "win32":
         try:
@@ -33,23 +25,65 @@ def hide_file_windows(filepath):
         except:
             pass
 
+_database_ready = threading.Event()
+_database_error = None
+_prewarm_started = False
+
 def initialize_database():
-    with sqlite3.connect(get_db_path()) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL
-        )''')
-        conn.commit()
+    # Migrations run while flet starts and draws the login screen; anything that
+    # reads the database waits for them through wait_for_database()
+    def migrate():
+        global _database_error
+        try:
+            import Schema
+            Schema.migrate()
+        except Exception as e:
+            _database_error = e
+        finally:
+            _database_ready.set()
+    threading.Thread(target=migrate, name="schema-migrate").start()
+
+def wait_for_database():
+    _database_ready.wait()
+    if _database_error is not None:
+        raise _database_error
+
+def prewarm():
+    global _prewarm_started
+    if _prewarm_started:
+        return
+    _prewarm_started = True
+
+    def load():
+        try:
+            for name in PREWARM_MODULES:
+                importlib.import_module(name)
+            import PDFExport
+            PDFExport.prewarm()
+        except Exception as e:
+            print(f"Failed to prewarm modules: {e}")
+    threading.Thread(target=load, name="prewarm", daemon=True).start()
+
+def report_first_frame():
+    # Hook for `python Manage.py startup`, which sets PF_STARTUP_PROBE and waits for this file
+    probe = os.getenv("PF_STARTUP_PROBE")
+    if probe:
+        with open(probe, "w") as f:
+            f.write(repr(time.time()))
 
 def validate_credentials(username, password):
+    wait_for_database()
     hashed_password = hashlib.sha256(password.encode()).hexdigest()
-    with sqlite3.connect(get_db_path()) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM users WHERE username=? AND password=?", (username, hashed_password))
+    with Database.reader() as conn:
+        cursor = conn.execute("SELECT id FROM users WHERE username=? AND password=?", (username, hashed_password))
         return cursor.fetchone() is not None
 
+def get_user_id(username):
+    wait_for_database()
+    with Database.reader() as conn:
+        row = conn.execute("SELECT id FROM users WHERE username=?", (username,)).fetchone()
+        return row[0] if row else None
+
 def save_session(username):
     path = get_credentials_path()
     try:
@@ -127,6 +161,8 @@ def login_ui(page: ft.Page):
             shadow=ft.BoxShadow(blur_radius=15, color="#B0BEC5")
         )
     )
+    report_first_frame()
+    prewarm()
 
 def signup_ui(page: ft.Page):
     page.clean()
@@ -146,10 +182,8 @@ def signup_ui(page: ft.Page):
             message_text.value = "Username already taken."
         else:
             hashed = hashlib.sha256(password.encode()).hexdigest()
-            with sqlite3.connect(get_db_path()) as conn:
-                cursor = conn.cursor()
-                cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed))
-                conn.commit()
+            with Database.writer() as conn:
+                conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed))
             login_ui(page)
         page.update()
 
@@ -182,9 +216,9 @@ def signup_ui(page: ft.Page):
     )
 
 def check_username_exists(username):
-    with sqlite3.connect(get_db_path()) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM users WHERE username=?", (username,))
+    wait_for_database()
+    with Database.reader() as conn:
+        cursor = conn.execute("SELECT id FROM users WHERE username=?", (username,))
         return cursor.fetchone() is not None
 
 def main_page(page: ft.Page):
@@ -202,6 +236,11 @@ def main_page(page: ft.Page):
         login_ui(page)
 
 def setup_main_ui(page: ft.Page, username: str):
+    user_id = get_user_id(username)
+    if user_id is None:
+        logout(page)
+        return
+
     page.title = "Personal Finance"
     page.bgcolor = "#E3F2FD"
     page.horizontal_alignment = ft.CrossAxisAlignment.CENTER
@@ -217,10 +256,10 @@ def setup_main_ui(page: ft.Page, username: str):
     layout = ft.Column([
         ft.Text("Personal Finance", size=30, weight=ft.FontWeight.BOLD, color="#0D47A1"),
         ft.Text(f"Welcome, {username}!", size=24, weight=ft.FontWeight.BOLD, color="#003366"),
-        ft.ElevatedButton("Transaction Record", on_click=lambda e: launch_transaction_record(page), style=button_style, width=380),
-        ft.ElevatedButton("Interest Calculator", on_click=lambda e: launch_interest_calculator(page), style=button_style, width=380),
-        ft.ElevatedButton("Budget Report", on_click=lambda e: launch_budget_report(page), style=button_style, width=380),
-        ft.ElevatedButton("Download PDF", on_click=lambda e: launch_download_pdf(page), style=button_style, width=380),
+        ft.ElevatedButton("Transaction Record", on_click=lambda e: launch_transaction_record(page, user_id), style=button_style, width=380),
+        ft.ElevatedButton("Interest Calculator", on_click=lambda e: launch_interest_calculator(page, user_id), style=button_style, width=380),
+        ft.ElevatedButton("Budget Report", on_click=lambda e: launch_budget_report(page, user_id), style=button_style, width=380),
+        ft.ElevatedButton("Download PDF", on_click=lambda e: launch_download_pdf(page, user_id), style=button_style, width=380),
         ft.ElevatedButton("Logout", on_click=lambda e: logout(page), style=ft.ButtonStyle(color="white"), width=80, bgcolor="#FF0000")
     ], spacing=20, alignment=ft.MainAxisAlignment.CENTER, horizontal_alignment=ft.CrossAxisAlignment.CENTER)
 
@@ -234,36 +273,28 @@ def logout(page: ft.Page):
             os.remove(path)
     except Exception as e:
         print(f"Failed to clear session: {e}")
+    UpdateScheduler.get_scheduler(page).report()
+    ViewRegistry.get_registry(page).forget()
     login_ui(page)
 
-def launch_transaction_record(page: ft.Page):
+def launch_transaction_record(page: ft.Page, user_id: int):
     from TransactionRecord import TransactionRecord
-    view = ft.View(route="/transaction", controls=[], bgcolor="#E3F2FD", scroll=ft.ScrollMode.AUTO)
-    TransactionRecord(page, view)
-    page.views.append(view)
-    page.go("/transaction")
+    ViewRegistry.get_registry(page).show("/transaction", TransactionRecord, user_id)
 
-def launch_interest_calculator(page: ft.Page):
+def launch_interest_calculator(page: ft.Page, user_id: int):
     from InterestCalculator import InterestCalculator
-    view = ft.View(route="/interest-calculator", controls=[], bgcolor="#E3F2FD", scroll=ft.ScrollMode.AUTO)
-    InterestCalculator(page, view)
-    page.views.append(view)
-    page.go("/interest-calculator")
+    ViewRegistry.get_registry(page).show("/interest-calculator", InterestCalculator, user_id)
 
-def launch_budget_report(page: ft.Page):
+def launch_budget_report(page: ft.Page, user_id: int):
     from BudgetReport import BudgetReport
-    view = ft.View(route="/budget-report", controls=[], bgcolor="#E3F2FD", scroll=ft.ScrollMode.AUTO)
-    BudgetReport(page, view)
-    page.views.append(view)
-    page.go("/budget-report")
+    ViewRegistry.get_registry(page).show("/budget-report", BudgetReport, user_id)
 
-def launch_download_pdf(page: ft.Page):
+def launch_download_pdf(page: ft.Page, user_id: int):
     from DownloadPDF import DownloadPDF
-    view = ft.View(route="/download-pdf", controls=[], bgcolor="#E3F2FD", scroll=ft.ScrollMode.AUTO)
-    DownloadPDF(page, view)
-    page.views.append(view)
-    page.go("/download-pdf")
+    ViewRegistry.get_registry(page).show("/download-pdf", DownloadPDF, user_id)
 
 if __name__ == "__main__":
+    # Scenario sweeps use a process pool, which frozen Windows builds must bootstrap
+    multiprocessing.freeze_support()
     initialize_database()
     ft.app(target=login_ui)
\ No newline at end of file
@@ -0,0 +1,158 @@
+import argparse
+import datetime
+import sys
+import Database
+import Importer
+import Ledger
+import Schema
+
+
+def check_plans(args):
+    ok = True
+    for name, plan, uses_index in Ledger.check_query_plans():
+        print(f"{name}: {'index' if uses_index else 'SCAN'}")
+        for step in plan:
+            print(f"    {step}")
+        ok = ok and uses_index
+    return 0 if ok else 1
+
+
+def rebuild_balance(args):
+    if args.verify:
+        mismatched = Ledger.verify_balance()
+        for user_id, (stored, actual) in sorted(mismatched.items()):
+            print(f"user {user_id}: stored {stored}, actual {actual}")
+        if mismatched:
+            print("Ledger balances are out of sync; run without --verify to rebuild.")
+            return 1
+        # With the stored balance checked, it is the reference for the day index the screen reads
+        import RunningBalance
+        with Database.reader() as conn:
+            user_ids = [row[0] for row in conn.execute("SELECT user_id FROM ledger_summary WHERE row_count > 0 ORDER BY user_id")]
+        drifted = False
+        for user_id in user_ids:
+            expected = Ledger.get_balance(user_id)
+            indexed = RunningBalance.get_index(user_id).balance_through(datetime.date.max)
+            if indexed != expected:
+                drifted = True
+                print(f"user {user_id}: day index {Ledger.format_money(indexed)}, ledger {Ledger.format_money(expected)}")
+        if drifted:
+            print("Running balance index disagrees with the ledger.")
+            return 1
+        print("Ledger balances are consistent.")
+        return 0
+    for user_id, balance in sorted(Ledger.rebuild_balance().items()):
+        print(f"user {user_id}: balance {Ledger.format_money(balance)}")
+    return 0
+
+
+def backfill_rollup(args):
+    print(f"Monthly rollup rebuilt: {Ledger.rebuild_rollup()} rows")
+    return 0
+
+
+def vacuum(args):
+    Database.vacuum()
+    print("Database compacted.")
+    return 0
+
+
+def migrate(args):
+    for number, description in Schema.migrate():
+        print(f"applied {number}: {description}")
+    with Database.reader() as conn:
+        print(f"Schema version: {Schema.current_version(conn)}")
+    return 0
+
+
+def import_statement(args):
+    with Database.reader() as conn:
+        row = conn.execute("SELECT id FROM users WHERE username = ?", (args.user,)).fetchone()
+    if row is None:
+        print(f"Unknown user: {args.user}")
+        return 1
+
+    def progress(stats):
+        print(f"  {stats.imported} rows, {stats.rows_per_second:,.0f} rows/s", flush=True)
+
+    stats = Importer.import_file(row[0], args.path, args.format, args.commit_every, progress=progress)
+    print(stats.summary())
+    for line_no, reason in stats.rejected_samples:
+        print(f"  line {line_no}: {reason}")
+    return 0
+
+
+def report(args):
+    with Database.reader() as conn:
+        row = conn.execute("SELECT id FROM users WHERE username = ?", (args.user,)).fetchone()
+    if row is None:
+        print(f"Unknown user: {args.user}")
+        return 1
+    print(f"{'Period':<10}{'Income':>15}{'Expenses':>15}{'Interest':>15}{'Net':>15}")
+    for label, income, expense, interest, net in Ledger.fetch_series(row[0], args.year, args.to_year or args.year, args.by):
+        print(f"{label:<10}" + "".join(f"{Ledger.format_money(value):>15}" for value in (income, expense, interest, net)))
+    return 0
+
+
+def startup(args):
+    import StartupBench
+    total, entries = StartupBench.import_breakdown("Main", args.runs)
+    main_import = StartupBench.module_time(entries, "Main")
+    print(f"Start-up imports: {total / 1000:.1f} ms, of which import Main: {main_import / 1000:.1f} ms")
+    print(f"{'Module':<44}{'Self ms':>10}{'Total ms':>10}")
+    for name, depth, own, cumulative in sorted((e for e in entries if e[1] <= 1), key=lambda e: e[3], reverse=True)[:args.top]:
+        print(f"{'  ' * depth + name:<44}{own / 1000:>10.1f}{cumulative / 1000:>10.1f}")
+    frame = None
+    if not args.no_window:
+        frame = StartupBench.first_frame()
+        print(f"Time to login screen: {frame * 1000:.0f} ms")
+    if args.record:
+        StartupBench.record(args.release or StartupBench.release_label(), total, main_import, frame)
+        print(f"Recorded in {StartupBench.HISTORY_FILE}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="Manage.py", description="Personal Finance maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("migrate", help="apply pending schema migrations").set_defaults(func=migrate)
+    commands.add_parser("check-plans", help="verify that report queries are answered from indexes").set_defaults(func=check_plans)
+
+    balance = commands.add_parser("rebuild-balance", help="recompute the persisted ledger balance from scratch")
+    balance.add_argument("--verify", action="store_true", help="only compare the stored balance with a full recount, and the day index with the stored balance")
+    balance.set_defaults(func=rebuild_balance)
+
+    commands.add_parser("vacuum", help="compact the database file after large migrations or deletes").set_defaults(func=vacuum)
+    commands.add_parser("backfill-rollup", help="rebuild monthly_rollup from the raw ledger").set_defaults(func=backfill_rollup)
+
+    importer = commands.add_parser("import", help="stream a CSV or OFX bank statement into the ledger")
+    importer.add_argument("path")
+    importer.add_argument("--user", required=True, help="username that owns the imported rows")
+    importer.add_argument("--format", choices=("csv", "ofx"), help="defaults to the file extension")
+    importer.add_argument("--commit-every", type=int, default=Importer.COMMIT_EVERY, help="rows per committed batch")
+    importer.set_defaults(func=import_statement)
+
+    series = commands.add_parser("report", help="print a month-by-month or year-by-year budget series")
+    series.add_argument("--user", required=True)
+    series.add_argument("--year", type=int, required=True, help="first year of the series")
+    series.add_argument("--to-year", type=int, help="last year of the series (defaults to --year)")
+    series.add_argument("--by", choices=("month", "year"), default="month")
+    series.set_defaults(func=report)
+
+    bench = commands.add_parser("startup", help="measure import time and time to the login screen")
+    bench.add_argument("--runs", type=int, default=5, help="fresh interpreters to take the median import time over")
+    bench.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    bench.add_argument("--no-window", action="store_true", help="skip launching the app (headless machines)")
+    bench.add_argument("--record", action="store_true", help="append the result to startup_history.csv")
+    bench.add_argument("--release", help="label for the recorded row (defaults to git describe)")
+    bench.set_defaults(func=startup)
+
+    args = parser.parse_args(argv)
+    if args.func is not migrate:
+        Schema.migrate()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import csv
+import numpy as np
+import Database
+
+DAYS_PER_YEAR = 365
+COMPOUNDING_PER_YEAR = {"Monthly": 12, "Quarterly": 4, "Half-Yearly": 2, "Annual": 1}
+PAYOUT_MODES = ("Cumulative", "Non-Cumulative")
+
+
+def periods_per_year(frequency):
+    frequency = np.asarray(frequency)
+    if frequency.dtype.kind in "USO":
+        lookup = np.vectorize(lambda name: COMPOUNDING_PER_YEAR[name], otypes=[np.float64])
+        return lookup(frequency)
+    return frequency.astype(np.float64)
+
+
+def cumulative_mask(payout):
+    payout = np.asarray(payout)
+    if payout.dtype.kind in "USO":
+        return payout == "Cumulative"
+    return payout.astype(bool)
+
+
+def maturity_amounts(principal, rate, tenure_days, frequency=1, payout="Cumulative"):
+    # Cumulative deposits compound at the given frequency; non-cumulative ones
+    # pay simple interest out, so their maturity value is principal plus payouts
+    principal = np.asarray(principal, dtype=np.float64)
+    rate = np.asarray(rate, dtype=np.float64) / 100
+    years = np.asarray(tenure_days, dtype=np.float64) / DAYS_PER_YEAR
+    n = periods_per_year(frequency)
+    compound = principal * np.power(1 + rate / n, n * years)
+    simple = principal * (1 + rate * years)
+    return np.where(cumulative_mask(payout), compound, simple)
+
+
+def maturity_dates(deposit_dates, tenure_days):
+    return np.asarray(deposit_dates, dtype="datetime64[D]") + np.asarray(tenure_days, dtype="timedelta64[D]")
+
+
+def evaluate(principal, rate, tenure_days, frequency=1, payout="Cumulative", deposit_dates=None):
+    amounts = maturity_amounts(principal, rate, tenure_days, frequency, payout)
+    dates = maturity_dates(deposit_dates, tenure_days) if deposit_dates is not None else None
+    return amounts, dates
+
+
+def load_portfolio(user_id):
+    with Database.reader() as conn:
+        rows = conn.execute('''
+            SELECT id, deposit_date, amount, interest_rate, tenure_days, compounding, deposit_type
+            FROM interest_calculations
+            WHERE user_id = ? AND tenure_days IS NOT NULL
+            ORDER BY deposit_date, id
+        ''', (user_id,)).fetchall()
+    if not rows:
+        empty = np.array([], dtype=np.float64)
+        return {"id": np.array([], dtype=np.int64), "deposit_date": np.array([], dtype="datetime64[D]"),
+                "principal": empty, "rate": empty, "tenure_days": np.array([], dtype=np.int64),
+                "frequency": empty, "cumulative": np.array([], dtype=bool)}
+    ids, dates, principal, rate, tenure, frequency, kind = zip(*rows)
+    return {
+        "id": np.array(ids, dtype=np.int64),
+        "deposit_date": np.array(dates, dtype="datetime64[D]"),
+        "principal": np.array(principal, dtype=np.float64) / 100,
+        "rate": np.array(rate, dtype=np.float64),
+        "tenure_days": np.array(tenure, dtype=np.int64),
+        "frequency": np.array(frequency, dtype=np.float64),
+        "cumulative": np.array(kind, dtype=object) == "Cumulative",
+    }
+
+
+def revalue_portfolio(user_id):
+    portfolio = load_portfolio(user_id)
+    amounts, dates = evaluate(
+        portfolio["principal"], portfolio["rate"], portfolio["tenure_days"],
+        portfolio["frequency"], portfolio["cumulative"], portfolio["deposit_date"],
+    )
+    return portfolio, amounts, dates
+
+
+SWEEP_CHUNK_CELLS = 1_000_000
+PARALLEL_THRESHOLD_CELLS = 4_000_000
+
+
+def parse_grid(text, cast=float):
+    values = [cast(part) for part in text.replace(";", ",").split(",") if part.strip()]
+    if not values:
+        raise ValueError("Enter at least one value.")
+    return values
+
+
+def sweep_chunk(principal, rate, tenure_days, frequency, cumulative, shifts_bp, tenures):
+    # Broadcast deposits x rate shifts x tenures and reduce over deposits
+    shifted = np.maximum(rate[:, None, None] + shifts_bp[None, :, None] / 100, 0)
+    tenure = tenure_days[:, None, None] if tenures is None else tenures[None, None, :]
+    amounts = maturity_amounts(
+        principal[:, None, None], shifted, tenure, frequency[:, None, None], cumulative[:, None, None]
+    )
+    return amounts.sum(axis=0), principal.sum()
+
+
+def sweep(portfolio, shifts_bp, tenures=None, workers=None, chunk_cells=SWEEP_CHUNK_CELLS):
+    shifts_bp = np.asarray(shifts_bp, dtype=np.float64)
+    tenures = None if tenures is None else np.asarray(tenures, dtype=np.int64)
+    deposits = len(portfolio["principal"])
+    tenure_count = 1 if tenures is None else len(tenures)
+    cells_per_deposit = len(shifts_bp) * tenure_count
+    step = max(1, chunk_cells // max(cells_per_deposit, 1))
+
+    columns = ("principal", "rate", "tenure_days", "frequency", "cumulative")
+    chunks = [
+        tuple(portfolio[name][i:i + step] for name in columns) + (shifts_bp, tenures)
+        for i in range(0, deposits, step)
+    ]
+
+    maturity = np.zeros((len(shifts_bp), tenure_count))
+    principal = 0.0
+    if deposits * cells_per_deposit >= PARALLEL_THRESHOLD_CELLS and len(chunks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(sweep_chunk, *zip(*chunks))
+            for chunk_maturity, chunk_principal in results:
+                maturity += chunk_maturity
+                principal += chunk_principal
+    else:
+        for chunk in chunks:
+            chunk_maturity, chunk_principal = sweep_chunk(*chunk)
+            maturity += chunk_maturity
+            principal += chunk_principal
+
+    return {
+        "shifts_bp": shifts_bp,
+        "tenures": tenures,
+        "maturity": maturity,
+        "interest": maturity - principal,
+        "principal": principal,
+        "deposits": deposits,
+        "cells": deposits * cells_per_deposit,
+    }
+
+
+def sweep_rows(result):
+    tenures = result["tenures"]
+    for i, shift in enumerate(result["shifts_bp"]):
+        for j in range(result["maturity"].shape[1]):
+            tenure = "As booked" if tenures is None else int(tenures[j])
+            yield float(shift), tenure, float(result["maturity"][i, j]), float(result["interest"][i, j])
+
+
+def export_sweep_csv(result, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Rate Shift (bp)", "Tenure (days)", "Total Maturity", "Total Interest"])
+        for shift, tenure, maturity, interest in sweep_rows(result):
+            writer.writerow([f"{shift:g}", tenure, f"{maturity:.2f}", f"{interest:.2f}"])
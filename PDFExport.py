@@ -0,0 +1,284 @@
+import os
+import queue
+import threading
+import time
+import Ledger
+import ResultCache
+
+ROWS_PER_TABLE = 40
+LOOKAHEAD_TABLES = 4
+PROGRESS_INTERVAL = 0.2
+
+# report type -> (headers, row source, row count, relative column widths, paise columns)
+REPORTS = {
+    "Interest Calculator": (
+        ["Deposit Date", "Maturity Date", "Deposit Type", "Amount", "Interest Rate", "Time", "Maturity"],
+        Ledger.iter_interest,
+        Ledger.count_interest,
+        [1.1, 1.1, 1.3, 1, 1, 1, 1.1],
+        (3, 6),
+    ),
+    "Transaction Record": (
+        ["Date", "Particular", "Amount", "Type", "Classification"],
+        Ledger.iter_transactions,
+        Ledger.count_transactions,
+        [1, 2.6, 1, 0.9, 1.4],
+        (2,),
+    ),
+}
+
+# Tables whose data version decides whether a cached PDF is still current
+REPORT_TABLES = {
+    "Interest Calculator": ("interest_calculations",),
+    "Transaction Record": ("transactions",),
+}
+
+_table_style = None
+
+
+def table_style():
+    # ReportLab is imported on first use (the export worker, or prewarm), never at module import
+    global _table_style
+    if _table_style is None:
+        from reportlab.lib import colors
+        from reportlab.platypus import TableStyle
+        _table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0D47A1")),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#E3F2FD")),
+        ])
+    return _table_style
+
+
+def prewarm():
+    # Load ReportLab off the UI thread before the first export needs it
+    table_style()
+
+
+class LazyFlowables(list):
+    # SimpleDocTemplate.build consumes its flowables from the front of a list;
+    # topping the list up from a generator keeps only a few tables alive at once
+    def __init__(self, source, lookahead=LOOKAHEAD_TABLES):
+        super().__init__()
+        self._source = iter(source)
+        self._lookahead = lookahead
+
+    def _fill(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                list.append(self, next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+def table_chunks(headers, rows, col_widths, rows_per_table=ROWS_PER_TABLE, progress=None):
+    from reportlab.platypus import Table
+    emitted = 0
+    for chunk in Ledger.chunked(rows, rows_per_table):
+        emitted += len(chunk)
+        table = Table([headers] + chunk, colWidths=col_widths, repeatRows=1)
+        table.setStyle(table_style())
+        if progress:
+            progress(emitted)
+        yield table
+    if not emitted:
+        table = Table([headers], colWidths=col_widths)
+        table.setStyle(table_style())
+        yield table
+
+
+def export_pdf(file_path, user_id, report_type, start, end, rows_per_table=ROWS_PER_TABLE, progress=None, page_progress=None):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate
+    headers, source, _, weights, money = REPORTS[report_type]
+    pdf = SimpleDocTemplate(file_path, pagesize=letter, leftMargin=0.5 * inch, rightMargin=0.5 * inch, pageCompression=1)
+    col_widths = [pdf.width * weight / sum(weights) for weight in weights]
+    rows = (
+        [Ledger.format_money(value) if index in money and value is not None else str(value) for index, value in enumerate(row)]
+        for row in source(user_id, start, end)
+    )
+    exported = [0]
+
+    def rows_done(count):
+        exported[0] = count
+        if progress:
+            progress(count)
+
+    def page_done(canvas, doc):
+        if page_progress:
+            page_progress(doc.page)
+
+    pdf.build(
+        LazyFlowables(table_chunks(headers, rows, col_widths, rows_per_table, rows_done)),
+        onFirstPage=page_done,
+        onLaterPages=page_done,
+    )
+    return exported[0]
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportJob:
+    def __init__(self, file_path, user_id, report_type, start, end):
+        self.file_path = file_path
+        self.user_id = user_id
+        self.report_type = report_type
+        self.start = start
+        self.end = end
+        self.status = "queued"
+        self.total_rows = 0
+        self.rows = 0
+        self.pages = 0
+        self.error = None
+        self.listeners = []
+        self._cancel = threading.Event()
+        self._last_notified = 0.0
+
+    @property
+    def fraction(self):
+        return self.rows / self.total_rows if self.total_rows else None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "cancelled", "failed")
+
+    def cancel(self):
+        self._cancel.set()
+        if self.status == "queued":
+            self.status = "cancelled"
+            self.notify(force=True)
+
+    def notify(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_notified < PROGRESS_INTERVAL:
+            return
+        self._last_notified = now
+        for listener in list(self.listeners):
+            try:
+                listener(self)
+            except Exception as ex:
+                print(f"Export progress listener failed: {ex}")
+
+    def _check_cancelled(self):
+        if self._cancel.is_set():
+            raise ExportCancelled()
+
+    def _rows_done(self, count):
+        self._check_cancelled()
+        self.rows = count
+        self.notify()
+
+    def _page_done(self, page):
+        self._check_cancelled()
+        self.pages = page
+        self.notify()
+
+    def _from_cache(self, key, versions):
+        cached = ResultCache.get_cache().get(key, versions)
+        if cached is None:
+            return False
+        data, self.total_rows, self.pages = cached
+        with open(self.file_path, "wb") as f:
+            f.write(data)
+        self.rows = self.total_rows
+        return True
+
+    def _store_in_cache(self, key, versions):
+        size = os.path.getsize(self.file_path)
+        if size > ResultCache.MAX_ENTRY_BYTES:
+            return
+        with open(self.file_path, "rb") as f:
+            data = f.read()
+        ResultCache.get_cache().put(key, versions, (data, self.rows, self.pages), size)
+
+    def run(self):
+        if self._cancel.is_set():
+            return
+        self.status = "running"
+        self.notify(force=True)
+        try:
+            key = ("pdf:" + self.report_type, (self.start, self.end), self.user_id)
+            versions = ResultCache.data_versions(REPORT_TABLES[self.report_type])
+            if not self._from_cache(key, versions):
+                self.total_rows = REPORTS[self.report_type][2](self.user_id, self.start, self.end)
+                self.rows = export_pdf(
+                    self.file_path, self.user_id, self.report_type, self.start, self.end,
+                    progress=self._rows_done, page_progress=self._page_done,
+                )
+                self._store_in_cache(key, versions)
+            self.status = "done"
+        except ExportCancelled:
+            self.status = "cancelled"
+        except Exception as ex:
+            self.status = "failed"
+            self.error = ex
+        if self.status != "done" and os.path.exists(self.file_path):
+            try:
+                os.remove(self.file_path)
+            except OSError:
+                pass
+        self.notify(force=True)
+
+
+class ExportQueue:
+    # One worker renders jobs in submission order so the UI thread never blocks on ReportLab
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.pending = []
+
+    def submit(self, job):
+        with self._lock:
+            self.pending.append(job)
+            self._jobs.put(job)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work, name="pdf-export", daemon=True)
+                self._thread.start()
+        job.notify(force=True)
+        return job
+
+    def _work(self):
+        while True:
+            try:
+                job = self._jobs.get(timeout=30)
+            except queue.Empty:
+                with self._lock:
+                    if self._jobs.empty():
+                        self._thread = None
+                        return
+                continue
+            job.run()
+            with self._lock:
+                self.pending.remove(job)
+
+    @property
+    def waiting(self):
+        with self._lock:
+            return sum(1 for job in self.pending if job.status == "queued")
+
+
+_export_queue = None
+_export_queue_lock = threading.Lock()
+
+
+def get_export_queue():
+    global _export_queue
+    with _export_queue_lock:
+        if _export_queue is None:
+            _export_queue = ExportQueue()
+        return _export_queue
@@ -0,0 +1,85 @@
+import threading
+from collections import OrderedDict
+import Database
+
+MAX_ENTRIES = 128
+MAX_BYTES = 64 * 1024 * 1024
+MAX_ENTRY_BYTES = 16 * 1024 * 1024
+AGGREGATE_ENTRY_BYTES = 4096
+
+# Tables each kind of result is computed from; reports read the rollup, which covers both
+REPORT_TABLES = ("transactions", "interest_calculations")
+
+
+def data_versions(tables):
+    with Database.reader() as conn:
+        placeholders = ", ".join("?" for _ in tables)
+        found = dict(conn.execute(f"SELECT name, version FROM data_version WHERE name IN ({placeholders})", tuple(tables)))
+    return tuple(found.get(table, 0) for table in tables)
+
+
+class ResultCache:
+    # LRU over (kind, period, user) keys. Each entry remembers the data versions
+    # of the tables it was computed from and is dropped once any of them moves on.
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != versions:
+                if entry is not None:
+                    self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, versions, value, size=AGGREGATE_ENTRY_BYTES):
+        if size > MAX_ENTRY_BYTES:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (versions, value, size)
+            self.size += size
+            while self._entries and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        self.size -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+def cached(kind, period, user_id, compute, tables=REPORT_TABLES):
+    # Versions are read before computing, so a write that lands mid-compute makes the entry stale at once
+    cache = get_cache()
+    key = (kind, period, user_id)
+    versions = data_versions(tables)
+    value = cache.get(key, versions)
+    if value is None:
+        value = compute()
+        cache.put(key, versions, value)
+    return value
@@ -0,0 +1,153 @@
+import datetime
+import threading
+import Database
+import Ledger
+
+# Spare day buckets kept on either side, so ordinary back-dated or future entries never resize the tree
+BUCKET_MARGIN_DAYS = 366
+
+
+def day_number(value):
+    return datetime.date.fromisoformat(Ledger.normalize_date(value)).toordinal()
+
+
+class FenwickTree:
+    def __init__(self, values=()):
+        # O(n) construction: each node pushes its sum up to its parent once
+        self.tree = [0] + list(values)
+        for i in range(1, len(self.tree)):
+            parent = i + (i & -i)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[i]
+
+    def __len__(self):
+        return len(self.tree) - 1
+
+    def add(self, index, delta):
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count):
+        # Sum of the first `count` values
+        total = 0
+        i = min(count, len(self))
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+class BalanceIndex:
+    # Net paise per calendar day for one user, in a Fenwick tree over day buckets.
+    # Balance as of a date is a prefix sum; inserting or deleting a row is one
+    # bucket update, wherever in the ledger it is dated.
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.first_day = 0
+        self.tree = FenwickTree()
+        self.total = 0
+        self.count = 0
+        self.version = None
+        self.rewrites = None
+        self._lock = threading.RLock()
+
+    def rebuild(self, conn):
+        rows = conn.execute('''
+            SELECT date, SUM(CASE WHEN type_id = ? THEN amount WHEN type_id = ? THEN -amount ELSE 0 END), COUNT(*)
+            FROM transactions
+            WHERE user_id = ? AND date IS NOT NULL
+            GROUP BY date
+        ''', (Ledger.TYPE_IDS["Income"], Ledger.TYPE_IDS["Expense"], self.user_id)).fetchall()
+        days = [(day_number(date), net, count) for date, net, count in rows]
+        today = datetime.date.today().toordinal()
+        low = min([today] + [day for day, _, _ in days]) - BUCKET_MARGIN_DAYS
+        high = max([today] + [day for day, _, _ in days]) + BUCKET_MARGIN_DAYS
+        buckets = [0] * (high - low + 1)
+        for day, net, _ in days:
+            buckets[day - low] += net
+        self.first_day = low
+        self.tree = FenwickTree(buckets)
+        self.total = sum(net for _, net, _ in days)
+        self.count = sum(count for _, _, count in days)
+
+    def _regrow(self, day):
+        values = [self.tree.prefix(i + 1) - self.tree.prefix(i) for i in range(len(self.tree))]
+        low = min(self.first_day, day - BUCKET_MARGIN_DAYS)
+        high = max(self.first_day + len(values) - 1, day + BUCKET_MARGIN_DAYS)
+        buckets = [0] * (high - low + 1)
+        buckets[self.first_day - low:self.first_day - low + len(values)] = values
+        self.first_day = low
+        self.tree = FenwickTree(buckets)
+
+    def apply(self, deltas):
+        # deltas: {date: (net paise, row count)}
+        with self._lock:
+            for date, (net, count) in deltas.items():
+                day = day_number(date)
+                if not self.first_day <= day < self.first_day + len(self.tree):
+                    self._regrow(day)
+                self.tree.add(day - self.first_day, net)
+                self.total += net
+                self.count += count
+            # Re-check against ledger_summary next time, in case the write was rolled back
+            self.version = None
+
+    def refresh(self):
+        with self._lock, Database.reader() as conn:
+            versions = dict(conn.execute(
+                "SELECT name, version FROM data_version WHERE name IN ('transactions', 'transactions_rewrites')"
+            ).fetchall())
+            version, rewrites = versions.get("transactions"), versions.get("transactions_rewrites")
+            if version == self.version and rewrites == self.rewrites:
+                return
+            # An update can move a row to another day and leave the totals alone,
+            # so any update or delete rebuilds; inserts only need the totals to agree
+            row = conn.execute("SELECT income - expense, row_count FROM ledger_summary WHERE user_id = ?", (self.user_id,)).fetchone()
+            if rewrites != self.rewrites or (row or (0, 0)) != (self.total, self.count) or not len(self.tree):
+                self.rebuild(conn)
+            self.version, self.rewrites = version, rewrites
+
+    def balance_through(self, date):
+        # Closing balance at the end of the given day
+        return self.balances_through([date])[0]
+
+    def balances_through(self, dates):
+        # One refresh for the lot, then a prefix sum per date
+        with self._lock:
+            self.refresh()
+            return [self.tree.prefix(day_number(date) - self.first_day + 1) for date in dates]
+
+    def balance_at(self, date, row_id):
+        # Balance straight after one row, with rows of the same day taken in id order
+        before = self.balance_through(datetime.date.fromordinal(day_number(date) - 1))
+        with Database.reader() as conn:
+            same_day = conn.execute('''
+                SELECT COALESCE(SUM(CASE WHEN type_id = ? THEN amount WHEN type_id = ? THEN -amount ELSE 0 END), 0)
+                FROM transactions
+                WHERE user_id = ? AND date = ? AND id <= ?
+            ''', (Ledger.TYPE_IDS["Income"], Ledger.TYPE_IDS["Expense"], self.user_id, Ledger.normalize_date(date), row_id)).fetchone()[0]
+        return before + same_day
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(user_id):
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+        if index is None:
+            index = _indexes[user_id] = BalanceIndex(user_id)
+    index.refresh()
+    return index
+
+
+def transactions_changed(user_id, deltas):
+    index = _indexes.get(user_id)
+    if index is not None:
+        index.apply(deltas)
+
+
+Ledger.add_change_listener(transactions_changed)
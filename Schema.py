@@ -0,0 +1,630 @@
+import datetime
+import re
+import sqlite3
+import Database
+import Ledger
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+TRANSACTIONS_TABLE = '''CREATE TABLE {if_not_exists} {name} (
+        id INTEGER PRIMARY KEY,
+        date TEXT,
+        particular TEXT,
+        amount REAL,
+        type_id INTEGER REFERENCES transaction_types(id),
+        classification_id INTEGER REFERENCES classifications(id){extra}
+    )'''
+
+
+def create_base_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY,
+        date TEXT,
+        particular TEXT,
+        amount REAL,
+        type TEXT,
+        classification TEXT
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS interest_calculations (
+        id INTEGER PRIMARY KEY,
+        deposit_date TEXT,
+        maturity_date TEXT,
+        amount REAL,
+        interest_rate REAL,
+        time_of_maturity TEXT,
+        maturity_amount REAL,
+        deposit_type TEXT
+    )''')
+
+
+def encode_transaction_lookups(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS transaction_types (
+        id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE NOT NULL
+    )''')
+    # user_id is NULL for the built-in categories and the creator's id otherwise
+    conn.execute('''CREATE TABLE IF NOT EXISTS classifications (
+        id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE NOT NULL,
+        user_id INTEGER REFERENCES users(id)
+    )''')
+    conn.executemany("INSERT OR IGNORE INTO transaction_types (id, name) VALUES (?, ?)",
+                     [(type_id, name) for name, type_id in Ledger.TYPE_IDS.items()])
+    conn.executemany("INSERT OR IGNORE INTO classifications (name) VALUES (?)",
+                     [(name,) for name in Ledger.DEFAULT_CLASSIFICATIONS])
+
+    columns = table_columns(conn, "transactions")
+    if "type_id" in columns:
+        return
+    # Older files spell type and classification out on every row; rebuild the table with integer keys
+    owned = "user_id" in columns
+    owner = "t.user_id" if owned else "NULL"
+    conn.execute("INSERT OR IGNORE INTO transaction_types (name) SELECT DISTINCT type FROM transactions WHERE type IS NOT NULL")
+    conn.execute(f'''
+        INSERT OR IGNORE INTO classifications (name, user_id)
+        SELECT t.classification, MIN({owner}) FROM transactions t
+        WHERE t.classification IS NOT NULL AND t.classification != ''
+        GROUP BY t.classification
+    ''')
+    conn.execute("DROP TABLE IF EXISTS transactions_encoded")
+    conn.execute(TRANSACTIONS_TABLE.format(
+        if_not_exists="", name="transactions_encoded",
+        extra=",\n        user_id INTEGER REFERENCES users(id)" if owned else "",
+    ))
+    conn.execute(f'''
+        INSERT INTO transactions_encoded (id, date, particular, amount, type_id, classification_id{", user_id" if owned else ""})
+        SELECT t.id, t.date, t.particular, t.amount, ty.id, c.id{", t.user_id" if owned else ""}
+        FROM transactions t
+        LEFT JOIN transaction_types ty ON ty.name = t.type
+        LEFT JOIN classifications c ON c.name = t.classification
+    ''')
+    conn.execute("DROP TABLE transactions")
+    conn.execute("ALTER TABLE transactions_encoded RENAME TO transactions")
+
+
+def create_classification_key(conn):
+    # Names are unique per owner; COALESCE folds the built-ins' NULL owner into one key
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_classifications_owner_name ON classifications (COALESCE(user_id, 0), name)")
+
+
+def own_classifications(conn):
+    # Names used to be unique across the whole file, so one user's category row
+    # could be shared by others, and legacy custom categories sat with the
+    # built-ins under a NULL owner. Rebuild without the global UNIQUE(name), then
+    # give every user their own row for each custom category they use.
+    builtin = ", ".join("?" * len(Ledger.DEFAULT_CLASSIFICATIONS))
+    shared = f'''
+        FROM transactions t JOIN classifications c ON c.id = t.classification_id
+        WHERE t.user_id IS NOT NULL
+          AND (c.user_id IS NOT t.user_id) AND NOT (c.user_id IS NULL AND c.name IN ({builtin}))'''
+    # transactions reference the table being swapped; recreating it under the
+    # same name and refilling it settles those references before the commit check
+    conn.execute("PRAGMA defer_foreign_keys = ON")
+    conn.execute("DROP TABLE IF EXISTS classifications_previous")
+    conn.execute("CREATE TABLE classifications_previous AS SELECT id, name, user_id FROM classifications")
+    conn.execute("DROP TABLE classifications")
+    conn.execute('''CREATE TABLE classifications (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        user_id INTEGER REFERENCES users(id)
+    )''')
+    conn.execute("INSERT INTO classifications (id, name, user_id) SELECT id, name, user_id FROM classifications_previous")
+    conn.execute("DROP TABLE classifications_previous")
+    conn.execute(f"INSERT INTO classifications (name, user_id) SELECT DISTINCT c.name, t.user_id {shared}",
+                 Ledger.DEFAULT_CLASSIFICATIONS)
+    conn.execute(f'''
+        UPDATE transactions SET classification_id = (
+            SELECT own.id FROM classifications own, classifications c
+            WHERE c.id = transactions.classification_id AND own.name = c.name AND own.user_id = transactions.user_id
+        )
+        WHERE id IN (SELECT t.id {shared})
+    ''', Ledger.DEFAULT_CLASSIFICATIONS)
+    # Legacy custom categories nobody's rows point at any more
+    conn.execute(f'''
+        DELETE FROM classifications
+        WHERE user_id IS NULL AND name NOT IN ({builtin})
+          AND id NOT IN (SELECT classification_id FROM transactions WHERE classification_id IS NOT NULL)
+    ''', Ledger.DEFAULT_CLASSIFICATIONS)
+    create_classification_key(conn)
+
+
+def add_user_partitioning(conn):
+    for table in ("transactions", "interest_calculations"):
+        if "user_id" not in table_columns(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN user_id INTEGER REFERENCES users(id)")
+    # Rows written before accounts owned data belong to the first account
+    owner = conn.execute("SELECT MIN(id) FROM users").fetchone()[0]
+    if owner is not None:
+        for table in ("transactions", "interest_calculations"):
+            conn.execute(f"UPDATE {table} SET user_id = ? WHERE user_id IS NULL", (owner,))
+
+
+def create_date_indexes(conn):
+    conn.execute("DROP INDEX IF EXISTS idx_transactions_date_type_amount")
+    conn.execute("DROP INDEX IF EXISTS idx_interest_deposit_date")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (user_id, date, type_id, amount)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_interest_user_date ON interest_calculations (user_id, deposit_date)")
+
+
+INCOME, EXPENSE = Ledger.TYPE_IDS["Income"], Ledger.TYPE_IDS["Expense"]
+
+
+def summary_add(row):
+    return f'''
+        INSERT INTO ledger_summary (user_id, income, expense, row_count)
+        VALUES ({row}.user_id,
+                CASE WHEN {row}.type_id = {INCOME} THEN {row}.amount ELSE 0 END,
+                CASE WHEN {row}.type_id = {EXPENSE} THEN {row}.amount ELSE 0 END,
+                1)
+        ON CONFLICT (user_id) DO UPDATE SET
+            income = income + excluded.income,
+            expense = expense + excluded.expense,
+            row_count = row_count + 1;'''
+
+
+def summary_remove(row):
+    return f'''
+        UPDATE ledger_summary SET
+            income = income - CASE WHEN {row}.type_id = {INCOME} THEN {row}.amount ELSE 0 END,
+            expense = expense - CASE WHEN {row}.type_id = {EXPENSE} THEN {row}.amount ELSE 0 END,
+            row_count = row_count - 1
+        WHERE user_id = {row}.user_id;'''
+
+
+# Bulk loads register themselves in bulk_load and fold their rows into the
+# aggregates in one grouped statement, so per-row insert triggers stand aside
+BULK_LOAD_GATE = "WHEN NOT EXISTS (SELECT 1 FROM bulk_load)"
+
+
+def create_summary_triggers(conn):
+    for event in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_transactions_summary_{event}")
+    conn.execute(f'''CREATE TRIGGER trg_transactions_summary_insert AFTER INSERT ON transactions {BULK_LOAD_GATE} BEGIN
+        {summary_add("NEW")}
+    END''')
+    conn.execute(f'''CREATE TRIGGER trg_transactions_summary_delete AFTER DELETE ON transactions BEGIN
+        {summary_remove("OLD")}
+    END''')
+    conn.execute(f'''CREATE TRIGGER trg_transactions_summary_update AFTER UPDATE OF amount, type_id, user_id ON transactions BEGIN
+        {summary_remove("OLD")}
+        {summary_add("NEW")}
+    END''')
+
+
+def create_ledger_summary(conn):
+    conn.execute("DROP TABLE IF EXISTS ledger_summary")
+    conn.execute('''CREATE TABLE ledger_summary (
+        user_id INTEGER PRIMARY KEY REFERENCES users(id),
+        income INTEGER NOT NULL DEFAULT 0,
+        expense INTEGER NOT NULL DEFAULT 0,
+        row_count INTEGER NOT NULL DEFAULT 0
+    )''')
+    create_summary_triggers(conn)
+    Ledger.rebuild_balance()
+
+
+# (table, date column, type expression, classification expression, amount column, watched columns) per rollup source
+ROLLUP_SOURCES = {
+    "transactions": (
+        "transactions", "date",
+        "(SELECT name FROM transaction_types WHERE id = {row}.type_id)",
+        "(SELECT name FROM classifications WHERE id = {row}.classification_id)",
+        "amount", "date, amount, classification_id, user_id, type_id",
+    ),
+    "interest": (
+        "interest_calculations", "deposit_date", "'Interest'", "{row}.deposit_type",
+        "maturity_amount", "deposit_date, maturity_amount, deposit_type, user_id",
+    ),
+}
+
+
+def rollup_add(source, row):
+    _, date, kind, classification, amount, _ = ROLLUP_SOURCES[source]
+    return f'''
+        INSERT INTO monthly_rollup (user_id, year, month, type, classification, total, count)
+        VALUES ({row}.user_id, CAST(substr({row}.{date}, 1, 4) AS INTEGER), CAST(substr({row}.{date}, 6, 2) AS INTEGER),
+                {kind.format(row=row)}, COALESCE({classification.format(row=row)}, ''), {row}.{amount}, 1)
+        ON CONFLICT (user_id, year, month, type, classification) DO UPDATE SET
+            total = total + excluded.total,
+            count = count + 1;'''
+
+
+def rollup_remove(source, row):
+    _, date, kind, classification, amount, _ = ROLLUP_SOURCES[source]
+    return f'''
+        UPDATE monthly_rollup SET total = total - {row}.{amount}, count = count - 1
+        WHERE user_id = {row}.user_id
+          AND year = CAST(substr({row}.{date}, 1, 4) AS INTEGER) AND month = CAST(substr({row}.{date}, 6, 2) AS INTEGER)
+          AND type = {kind.format(row=row)} AND classification = COALESCE({classification.format(row=row)}, '');
+        DELETE FROM monthly_rollup WHERE user_id = {row}.user_id AND count <= 0;'''
+
+
+def create_rollup_triggers(conn):
+    for source, (table, _, _, _, _, columns) in ROLLUP_SOURCES.items():
+        for event in ("insert", "delete", "update"):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{source}_rollup_{event}")
+        gate = BULK_LOAD_GATE if source == "transactions" else ""
+        conn.execute(f'''CREATE TRIGGER trg_{source}_rollup_insert AFTER INSERT ON {table} {gate} BEGIN
+            {rollup_add(source, "NEW")}
+        END''')
+        conn.execute(f'''CREATE TRIGGER trg_{source}_rollup_delete AFTER DELETE ON {table} BEGIN
+            {rollup_remove(source, "OLD")}
+        END''')
+        conn.execute(f'''CREATE TRIGGER trg_{source}_rollup_update AFTER UPDATE OF {columns} ON {table} BEGIN
+            {rollup_remove(source, "OLD")}
+            {rollup_add(source, "NEW")}
+        END''')
+
+
+def create_monthly_rollup(conn):
+    conn.execute("DROP TABLE IF EXISTS monthly_rollup")
+    conn.execute('''CREATE TABLE monthly_rollup (
+        user_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        classification TEXT NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, year, month, type, classification)
+    ) WITHOUT ROWID''')
+    create_rollup_triggers(conn)
+    Ledger.rebuild_rollup()
+
+
+def add_deposit_terms(conn):
+    columns = table_columns(conn, "interest_calculations")
+    if "tenure_days" not in columns:
+        conn.execute("ALTER TABLE interest_calculations ADD COLUMN tenure_days INTEGER")
+    if "compounding" not in columns:
+        conn.execute("ALTER TABLE interest_calculations ADD COLUMN compounding INTEGER NOT NULL DEFAULT 1")
+    # Older rows only carry the "N year(s)" label; CAST keeps the leading number
+    conn.execute("UPDATE interest_calculations SET tenure_days = CAST(time_of_maturity AS INTEGER) * 365 WHERE tenure_days IS NULL")
+
+
+VERSIONED_TABLES = ("transactions", "interest_calculations")
+
+
+def create_version_triggers(conn):
+    for table in VERSIONED_TABLES:
+        for event in ("insert", "delete", "update"):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version_{event}")
+            # Bulk loads bump the counter once themselves
+            gate = BULK_LOAD_GATE if event == "insert" and table == "transactions" else ""
+            conn.execute(f'''CREATE TRIGGER trg_{table}_version_{event} AFTER {event.upper()} ON {table} {gate} BEGIN
+                UPDATE data_version SET version = version + 1 WHERE name = '{table}';
+            END''')
+
+
+def create_data_version(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS data_version (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID''')
+    conn.executemany("INSERT OR IGNORE INTO data_version (name) VALUES (?)", [(table,) for table in VERSIONED_TABLES])
+    create_version_triggers(conn)
+
+
+def create_rewrite_counter(conn):
+    # Counts only updates and deletes, so in-memory copies of the ledger can tell
+    # appended rows (load the new ids) from rows changed in place (reload)
+    conn.execute("INSERT OR IGNORE INTO data_version (name) VALUES ('transactions_rewrites')")
+    for event in ("delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_transactions_rewrite_{event}")
+        conn.execute(f'''CREATE TRIGGER trg_transactions_rewrite_{event} AFTER {event.upper()} ON transactions BEGIN
+            UPDATE data_version SET version = version + 1 WHERE name = 'transactions_rewrites';
+        END''')
+
+
+def create_search_triggers(conn):
+    for event in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_transactions_search_{event}")
+    # External-content FTS5 keeps only the index; deletes must hand back the old text
+    conn.execute(f'''CREATE TRIGGER trg_transactions_search_insert AFTER INSERT ON transactions {BULK_LOAD_GATE} BEGIN
+        INSERT INTO transactions_fts (rowid, particular) VALUES (NEW.id, NEW.particular);
+    END''')
+    conn.execute('''CREATE TRIGGER trg_transactions_search_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, particular) VALUES ('delete', OLD.id, OLD.particular);
+    END''')
+    conn.execute('''CREATE TRIGGER trg_transactions_search_update AFTER UPDATE OF particular ON transactions BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, particular) VALUES ('delete', OLD.id, OLD.particular);
+        INSERT INTO transactions_fts (rowid, particular) VALUES (NEW.id, NEW.particular);
+    END''')
+
+
+def create_transaction_search(conn):
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        particular,
+        content='transactions',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )''')
+    conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+    create_search_triggers(conn)
+
+
+def create_history_index(conn):
+    # The rowid trails every index key, so this orders a user's rows by (date, id) for keyset paging
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user_history ON transactions (user_id, date)")
+
+
+def search_owner(row):
+    # Each row is indexed with an owner token, so a search matches only that user's rows
+    return f"'u' || {row}.user_id"
+
+
+def create_owned_search(conn):
+    # Contentless this time: results are joined back to transactions anyway, and
+    # the owner token has no column of its own there to be external content for.
+    # Prefix indexes for 2-6 characters answer typed-ahead terms from one doclist
+    # instead of merging every matching token's; they triple the index size.
+    for event in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_transactions_search_{event}")
+    conn.execute("DROP TABLE IF EXISTS transactions_fts")
+    conn.execute('''CREATE VIRTUAL TABLE transactions_fts USING fts5(
+        particular,
+        owner,
+        content='',
+        prefix='2 3 4 5 6',
+        tokenize='unicode61 remove_diacritics 2'
+    )''')
+    conn.execute(f"INSERT INTO transactions_fts (rowid, particular, owner) SELECT id, particular, {search_owner('t')} FROM transactions t")
+    conn.execute(f'''CREATE TRIGGER trg_transactions_search_insert AFTER INSERT ON transactions {BULK_LOAD_GATE} BEGIN
+        INSERT INTO transactions_fts (rowid, particular, owner) VALUES (NEW.id, NEW.particular, {search_owner("NEW")});
+    END''')
+    conn.execute(f'''CREATE TRIGGER trg_transactions_search_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, particular, owner) VALUES ('delete', OLD.id, OLD.particular, {search_owner("OLD")});
+    END''')
+    conn.execute(f'''CREATE TRIGGER trg_transactions_search_update AFTER UPDATE OF particular, user_id ON transactions BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, particular, owner) VALUES ('delete', OLD.id, OLD.particular, {search_owner("OLD")});
+        INSERT INTO transactions_fts (rowid, particular, owner) VALUES (NEW.id, NEW.particular, {search_owner("NEW")});
+    END''')
+
+
+# Steps 3-6 as they first shipped, for the type/classification text columns and
+# REAL money those steps saw. Migrations are history: later layouts get new
+# steps (9, 10) rather than edits here, and these never call into Ledger, whose
+# queries follow the current layout.
+def legacy_create_date_indexes(conn):
+    conn.execute("DROP INDEX IF EXISTS idx_transactions_date_type_amount")
+    conn.execute("DROP INDEX IF EXISTS idx_interest_deposit_date")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (user_id, date, type, amount)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_interest_user_date ON interest_calculations (user_id, deposit_date)")
+
+
+def legacy_summary_add(row):
+    return f'''
+        INSERT INTO ledger_summary (user_id, income, expense, row_count)
+        VALUES ({row}.user_id,
+                CASE WHEN {row}.type = 'Income' THEN {row}.amount ELSE 0 END,
+                CASE WHEN {row}.type = 'Expense' THEN {row}.amount ELSE 0 END,
+                1)
+        ON CONFLICT (user_id) DO UPDATE SET
+            income = income + excluded.income,
+            expense = expense + excluded.expense,
+            row_count = row_count + 1;'''
+
+
+def legacy_summary_remove(row):
+    return f'''
+        UPDATE ledger_summary SET
+            income = income - CASE WHEN {row}.type = 'Income' THEN {row}.amount ELSE 0 END,
+            expense = expense - CASE WHEN {row}.type = 'Expense' THEN {row}.amount ELSE 0 END,
+            row_count = row_count - 1
+        WHERE user_id = {row}.user_id;'''
+
+
+def legacy_create_summary_triggers(conn, gate=""):
+    for event in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_transactions_summary_{event}")
+    conn.execute(f'''CREATE TRIGGER trg_transactions_summary_insert AFTER INSERT ON transactions {gate} BEGIN
+        {legacy_summary_add("NEW")}
+    END''')
+    conn.execute(f'''CREATE TRIGGER trg_transactions_summary_delete AFTER DELETE ON transactions BEGIN
+        {legacy_summary_remove("OLD")}
+    END''')
+    conn.execute(f'''CREATE TRIGGER trg_transactions_summary_update AFTER UPDATE OF amount, type, user_id ON transactions BEGIN
+        {legacy_summary_remove("OLD")}
+        {legacy_summary_add("NEW")}
+    END''')
+
+
+def legacy_create_ledger_summary(conn):
+    conn.execute("DROP TABLE IF EXISTS ledger_summary")
+    conn.execute('''CREATE TABLE ledger_summary (
+        user_id INTEGER PRIMARY KEY REFERENCES users(id),
+        income REAL NOT NULL DEFAULT 0,
+        expense REAL NOT NULL DEFAULT 0,
+        row_count INTEGER NOT NULL DEFAULT 0
+    )''')
+    legacy_create_summary_triggers(conn)
+    conn.execute('''
+        INSERT INTO ledger_summary (user_id, income, expense, row_count)
+        SELECT user_id,
+               COALESCE(SUM(CASE WHEN type = 'Income' THEN amount ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN type = 'Expense' THEN amount ELSE 0 END), 0),
+               COUNT(*)
+        FROM transactions
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+    ''')
+
+
+# (table, date column, type expression, classification column, amount column) per rollup source
+LEGACY_ROLLUP_SOURCES = {
+    "transactions": ("transactions", "date", "{row}.type", "classification", "amount"),
+    "interest": ("interest_calculations", "deposit_date", "'Interest'", "deposit_type", "maturity_amount"),
+}
+
+
+def legacy_rollup_add(source, row):
+    _, date, kind, classification, amount = LEGACY_ROLLUP_SOURCES[source]
+    return f'''
+        INSERT INTO monthly_rollup (user_id, year, month, type, classification, total, count)
+        VALUES ({row}.user_id, CAST(substr({row}.{date}, 1, 4) AS INTEGER), CAST(substr({row}.{date}, 6, 2) AS INTEGER),
+                {kind.format(row=row)}, COALESCE({row}.{classification}, ''), {row}.{amount}, 1)
+        ON CONFLICT (user_id, year, month, type, classification) DO UPDATE SET
+            total = total + excluded.total,
+            count = count + 1;'''
+
+
+def legacy_rollup_remove(source, row):
+    _, date, kind, classification, amount = LEGACY_ROLLUP_SOURCES[source]
+    return f'''
+        UPDATE monthly_rollup SET total = total - {row}.{amount}, count = count - 1
+        WHERE user_id = {row}.user_id
+          AND year = CAST(substr({row}.{date}, 1, 4) AS INTEGER) AND month = CAST(substr({row}.{date}, 6, 2) AS INTEGER)
+          AND type = {kind.format(row=row)} AND classification = COALESCE({row}.{classification}, '');
+        DELETE FROM monthly_rollup WHERE user_id = {row}.user_id AND count <= 0;'''
+
+
+def legacy_create_rollup_triggers(conn, gate=""):
+    for source, (table, date, _, classification, amount) in LEGACY_ROLLUP_SOURCES.items():
+        for event in ("insert", "delete", "update"):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{source}_rollup_{event}")
+        columns = f"{date}, {amount}, {classification}, user_id" + (", type" if source == "transactions" else "")
+        insert_gate = gate if source == "transactions" else ""
+        conn.execute(f'''CREATE TRIGGER trg_{source}_rollup_insert AFTER INSERT ON {table} {insert_gate} BEGIN
+            {legacy_rollup_add(source, "NEW")}
+        END''')
+        conn.execute(f'''CREATE TRIGGER trg_{source}_rollup_delete AFTER DELETE ON {table} BEGIN
+            {legacy_rollup_remove(source, "OLD")}
+        END''')
+        conn.execute(f'''CREATE TRIGGER trg_{source}_rollup_update AFTER UPDATE OF {columns} ON {table} BEGIN
+            {legacy_rollup_remove(source, "OLD")}
+            {legacy_rollup_add(source, "NEW")}
+        END''')
+
+
+def legacy_create_monthly_rollup(conn):
+    conn.execute("DROP TABLE IF EXISTS monthly_rollup")
+    conn.execute('''CREATE TABLE monthly_rollup (
+        user_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        classification TEXT NOT NULL,
+        total REAL NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, year, month, type, classification)
+    ) WITHOUT ROWID''')
+    legacy_create_rollup_triggers(conn)
+    conn.execute('''
+        INSERT INTO monthly_rollup (user_id, year, month, type, classification, total, count)
+        SELECT user_id, CAST(substr(date, 1, 4) AS INTEGER), CAST(substr(date, 6, 2) AS INTEGER),
+               type, COALESCE(classification, ''), SUM(amount), COUNT(*)
+        FROM transactions
+        WHERE user_id IS NOT NULL AND date IS NOT NULL AND type IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+    ''')
+    conn.execute('''
+        INSERT INTO monthly_rollup (user_id, year, month, type, classification, total, count)
+        SELECT user_id, CAST(substr(deposit_date, 1, 4) AS INTEGER), CAST(substr(deposit_date, 6, 2) AS INTEGER),
+               'Interest', COALESCE(deposit_type, ''), SUM(maturity_amount), COUNT(*)
+        FROM interest_calculations
+        WHERE user_id IS NOT NULL AND deposit_date IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+    ''')
+
+
+def legacy_add_bulk_load_gate(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS bulk_load (user_id INTEGER NOT NULL)")
+    legacy_create_summary_triggers(conn, BULK_LOAD_GATE)
+    legacy_create_rollup_triggers(conn, BULK_LOAD_GATE)
+
+
+def encode_transactions(conn):
+    # Rebuilding the table drops its indexes and triggers, so put them back
+    encode_transaction_lookups(conn)
+    create_date_indexes(conn)
+    create_summary_triggers(conn)
+    create_rollup_triggers(conn)
+    create_version_triggers(conn)
+
+
+def rebuild_as_paise(conn, table, money_columns):
+    # REAL affinity turns stored integers straight back into floats, so the
+    # columns' declared type has to change, which SQLite only allows by copying
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    sql = re.sub(r"^CREATE TABLE\s+\"?\w+\"?", f"CREATE TABLE {table}_paise", sql)
+    for column in money_columns:
+        sql = re.sub(rf"\b{column}\s+REAL\b", f"{column} INTEGER", sql)
+    columns = table_columns(conn, table)
+    values = [f"CAST(ROUND({name} * 100) AS INTEGER)" if name in money_columns else name for name in columns]
+    conn.execute(f"DROP TABLE IF EXISTS {table}_paise")
+    conn.execute(sql)
+    conn.execute(f"INSERT INTO {table}_paise ({', '.join(columns)}) SELECT {', '.join(values)} FROM {table}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_paise RENAME TO {table}")
+
+
+def store_paise(conn):
+    rebuild_as_paise(conn, "transactions", ("amount",))
+    rebuild_as_paise(conn, "interest_calculations", ("amount", "maturity_amount"))
+    create_date_indexes(conn)
+    create_version_triggers(conn)
+    # Both aggregates are recreated with INTEGER totals and recounted exactly
+    create_ledger_summary(conn)
+    create_monthly_rollup(conn)
+
+
+# Ordered, append-only. Every step must also cope with databases created
+# before versioning existed, where some of its objects may already be present.
+MIGRATIONS = [
+    (1, "base tables", create_base_tables),
+    (2, "per-user ownership", add_user_partitioning),
+    (3, "composite date indexes", legacy_create_date_indexes),
+    (4, "ledger balance summary", legacy_create_ledger_summary),
+    (5, "monthly rollup", legacy_create_monthly_rollup),
+    (6, "bulk load aggregate gate", legacy_add_bulk_load_gate),
+    (7, "deposit tenure and compounding", add_deposit_terms),
+    (8, "per-table data version counters", create_data_version),
+    (9, "dictionary-encoded transaction type and classification", encode_transactions),
+    (10, "money stored as integer paise", store_paise),
+    (11, "full-text search over particulars", create_transaction_search),
+    (12, "keyset index for transaction history", create_history_index),
+    (13, "rewrite counter for in-memory ledger copies", create_rewrite_counter),
+    (14, "categories owned per user", own_classifications),
+    (15, "search index partitioned by user", create_owned_search),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    try:
+        return conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        return 0
+
+
+def migrate():
+    with Database.reader() as conn:
+        if current_version(conn) >= LATEST_VERSION:
+            return []
+    applied = []
+    with Database.writer() as conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )''')
+        version = current_version(conn)
+        for number, description, step in MIGRATIONS:
+            if number <= version:
+                continue
+            step(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (number, description, datetime.datetime.now().isoformat(timespec="seconds")),
+            )
+            applied.append((number, description))
+    return applied
@@ -0,0 +1,88 @@
+import csv
+import datetime
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# One row per measured release, committed alongside the code it measures
+HISTORY_FILE = os.path.join(HERE, "startup_history.csv")
+HISTORY_FIELDS = ("release", "date", "python", "platform", "interpreter_ms", "main_import_ms", "first_frame_ms")
+FIRST_FRAME_TIMEOUT = 60
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def import_breakdown(module="Main", runs=5):
+    # `-X importtime` for one import in a fresh interpreter, repeated; returns the
+    # median run as (total us, [(name, depth, self us, cumulative us), ...])
+    results = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              cwd=HERE, capture_output=True, text=True)
+        if proc.returncode:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+        entries = []
+        for line in proc.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match:
+                entries.append((match[4], len(match[3]) // 2, int(match[1]), int(match[2])))
+        results.append((sum(cumulative for _, depth, _, cumulative in entries if depth == 0), entries))
+    results.sort(key=lambda result: result[0])
+    return results[len(results) // 2]
+
+
+def module_time(entries, module):
+    return next((cumulative for name, depth, _, cumulative in entries if name == module and depth == 0), 0)
+
+
+def first_frame(timeout=FIRST_FRAME_TIMEOUT):
+    # Seconds from spawning `python Main.py` to the login screen being sent to the client
+    fd, probe = tempfile.mkstemp(suffix=".startup")
+    os.close(fd)
+    os.remove(probe)
+    started = time.time()
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, "Main.py")], cwd=HERE,
+                            env=dict(os.environ, PF_STARTUP_PROBE=probe))
+    try:
+        while time.time() - started < timeout:
+            if os.path.exists(probe) and os.path.getsize(probe):
+                with open(probe) as f:
+                    return float(f.read()) - started
+            if proc.poll() is not None:
+                raise RuntimeError(f"Main.py exited with code {proc.returncode} before drawing the login screen")
+            time.sleep(0.01)
+        raise TimeoutError(f"No frame within {timeout} s")
+    finally:
+        proc.terminate()
+        proc.wait()
+        if os.path.exists(probe):
+            os.remove(probe)
+
+
+def release_label():
+    try:
+        return subprocess.run(["git", "describe", "--tags", "--always", "--dirty"], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "dev"
+
+
+def record(release, interpreter_us, main_import_us, frame_seconds):
+    new_file = not os.path.exists(HISTORY_FILE)
+    with open(HISTORY_FILE, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(HISTORY_FIELDS)
+        writer.writerow((
+            release,
+            datetime.date.today().isoformat(),
+            platform.python_version(),
+            sys.platform,
+            round(interpreter_us / 1000, 1),
+            round(main_import_us / 1000, 1),
+            "" if frame_seconds is None else round(frame_seconds * 1000, 1),
+        ))
@@ -1,30 +1,41 @@
 import flet as ft
-import sqlite3
-from Main import get_db_path
+import Importer
+import Ledger
+import RunningBalance
+import UpdateScheduler
+import ViewRegistry
 import datetime
+import threading
+
+HISTORY_ROW_HEIGHT = 36
+HISTORY_WINDOW = 300
+HISTORY_PREFETCH_ROWS = 20
+HISTORY_ACTIONS_WIDTH = 120
+
 
 class TransactionRecord:
-    def __init__(self, page, view: ft.View):
+    def __init__(self, page, view: ft.View, user_id: int):
         self.page = page
         self.view = view
+        self.user_id = user_id
+        self.updates = UpdateScheduler.get_scheduler(page)
+        self.views = ViewRegistry.get_registry(page)
         self.page.window_maximized = True
         self.page.window_full_screen = True
         self.page.scroll = ft.ScrollMode.AUTO
-        self.page.update()
 
-        self.entries = []
-        self.balance = 0
+        # Every on-screen row is keyed by a stable id: the rowid once saved, a
+        # negative temporary id before that. Lookups, edits and deletes go by id.
+        self.entries = {}
+        self.pending_rows = {}
+        self.hidden_rows = 0
+        self.next_temp_id = -1
+        self.selected_ids = set()
+        self.editing_id = None
 
         self.view.title = "Transaction Record"
         self.view.bgcolor = "#E3F2FD"
 
-        self.date_picker = ft.DatePicker(
-            on_change=self.date_selected,
-            first_date=datetime.date(2000, 1, 1),
-            last_date=datetime.date(2025, 12, 31),
-        )
-        self.page.overlay.append(self.date_picker)
-
         field_width = 360
 
         self.date_field = ft.TextField(
@@ -66,17 +77,21 @@ class TransactionRecord:
 
         self.classification_dropdown = ft.Dropdown(
             label="Classification",
-            options=[
-                ft.dropdown.Option("Food"), ft.dropdown.Option("Clothes"), ft.dropdown.Option("Bills/Rent"),
-                ft.dropdown.Option("Larger Purchases"), ft.dropdown.Option("Transportation"),
-                ft.dropdown.Option("Groceries"), ft.dropdown.Option("Entertainment"),
-                ft.dropdown.Option("Salary"), ft.dropdown.Option("Loan/Debt")
-            ],
+            options=[ft.dropdown.Option(name) for name in self.load_classifications()],
             width=field_width,
             dense=True,
             on_change=lambda e: self.add_button.focus()
         )
 
+        self.new_category_field = ft.TextField(
+            label="New Category",
+            width=field_width - 50,
+            text_align=ft.TextAlign.CENTER,
+            dense=True,
+            on_submit=self.add_category
+        )
+        self.add_category_button = ft.IconButton(icon="add", on_click=self.add_category)
+
         self.add_button = ft.ElevatedButton(
             "Add", on_click=self.add_entry, width=130,
             bgcolor="#1565C0", color="white",
@@ -89,8 +104,100 @@ class TransactionRecord:
             style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
         )
 
+        self.import_button = ft.ElevatedButton(
+            "Import", on_click=self.request_import_file, width=130,
+            bgcolor="#1565C0", color="white",
+            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
+        )
+        self.import_status = ft.Text("", size=14, color="#0D47A1")
+
+        self.delete_selected_button = ft.ElevatedButton(
+            "Delete Selected", on_click=self.delete_selected, width=150,
+            bgcolor="#C62828", color="white",
+            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
+        )
+
+        self.form_controls = (
+            self.date_field, self.type_dropdown, self.particular_field, self.amount_field,
+            self.classification_dropdown, self.add_button
+        )
+
         self.table = self.create_data_table()
 
+        filter_width = 160
+        self.filter_from_field = ft.TextField(label="From (DD/MM/YYYY)", width=filter_width, dense=True)
+        self.filter_to_field = ft.TextField(label="To (DD/MM/YYYY)", width=filter_width, dense=True)
+        self.filter_type_dropdown = ft.Dropdown(
+            label="Type", width=filter_width, dense=True, value="Any",
+            options=[ft.dropdown.Option("Any"), ft.dropdown.Option("Income"), ft.dropdown.Option("Expense")]
+        )
+        self.filter_classification_dropdown = ft.Dropdown(
+            label="Classification", width=filter_width, dense=True, value="Any",
+            options=[ft.dropdown.Option("Any")] + [ft.dropdown.Option(o.key) for o in self.classification_dropdown.options]
+        )
+        self.filter_min_field = ft.TextField(label="Min Amount", width=filter_width, dense=True)
+        self.filter_max_field = ft.TextField(label="Max Amount", width=filter_width, dense=True)
+        self.filter_group_dropdown = ft.Dropdown(
+            label="Group By", width=filter_width, dense=True, value="classification",
+            options=[ft.dropdown.Option(key, key.capitalize()) for key in ("classification", "type", "month")]
+        )
+        self.filter_button = ft.ElevatedButton(
+            "Apply Filter", on_click=self.apply_filter, width=filter_width,
+            bgcolor="#1565C0", color="white",
+            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
+        )
+        self.filter_summary = ft.Text("", size=14, color="#0D47A1")
+        self.filter_table = ft.DataTable(columns=[
+            ft.DataColumn(ft.Text("Group", size=14)),
+            ft.DataColumn(ft.Text("Total", size=14), numeric=True),
+            ft.DataColumn(ft.Text("Entries", size=14), numeric=True),
+        ], rows=[])
+
+        self.search_field = ft.TextField(
+            label="Search Particulars", width=330, dense=True, prefix_icon="search",
+            on_submit=lambda e: self.search(0)
+        )
+        self.search_from_field = ft.TextField(label="From (DD/MM/YYYY)", width=filter_width, dense=True)
+        self.search_to_field = ft.TextField(label="To (DD/MM/YYYY)", width=filter_width, dense=True)
+        self.search_classification_dropdown = ft.Dropdown(
+            label="Classification", width=filter_width, dense=True, value="Any",
+            options=[ft.dropdown.Option("Any")] + [ft.dropdown.Option(o.key) for o in self.classification_dropdown.options]
+        )
+        self.search_button = ft.ElevatedButton(
+            "Search", on_click=lambda e: self.search(0), width=filter_width,
+            bgcolor="#1565C0", color="white",
+            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
+        )
+        self.search_table = ft.DataTable(columns=[
+            ft.DataColumn(ft.Text("Date", size=14)),
+            ft.DataColumn(ft.Text("Particular", size=14)),
+            ft.DataColumn(ft.Text("Amount", size=14), numeric=True),
+            ft.DataColumn(ft.Text("Type", size=14)),
+            ft.DataColumn(ft.Text("Classification", size=14)),
+        ], rows=[])
+        self.search_page = 0
+        # search_cursors[n] is the id the nth page starts below; None for the first page
+        self.search_cursors = [None]
+        self.search_prev_button = ft.IconButton(icon="chevron_left", disabled=True, on_click=lambda e: self.search(self.search_page - 1))
+        self.search_next_button = ft.IconButton(icon="chevron_right", disabled=True, on_click=lambda e: self.search(self.search_page + 1))
+        self.search_page_text = ft.Text("", size=14, color="#0D47A1")
+
+        # Persisted ledger, newest first. Only a window of rows is ever live;
+        # scrolling near either edge pages in by (date, id) and trims the far side.
+        self.history_rows = []
+        self.history_index = {}
+        self.history_at_start = True
+        self.history_at_end = True
+        self.history_loading = False
+        self.history_list = ft.ListView(
+            height=360,
+            item_extent=HISTORY_ROW_HEIGHT,
+            on_scroll_interval=100,
+            on_scroll=self.history_scrolled
+        )
+        self.history_header = self.history_row_control(("Date", "Particular", "Income", "Expense", "Balance", "Classification"), bold=True,
+                                                       actions=[ft.Container(width=HISTORY_ACTIONS_WIDTH)])
+
         self.header = ft.Row([
             ft.IconButton(icon="arrow_back", on_click=self.go_back),
             ft.Container(
@@ -112,7 +219,9 @@ class TransactionRecord:
                 self.amount_field,
                 self.date_field,
                 self.classification_dropdown,
-                ft.Row([self.add_button, self.save_button], alignment=ft.MainAxisAlignment.CENTER, spacing=15),
+                ft.Row([self.new_category_field, self.add_category_button], alignment=ft.MainAxisAlignment.CENTER, spacing=5),
+                ft.Row([self.add_button, self.save_button, self.import_button, self.delete_selected_button], alignment=ft.MainAxisAlignment.CENTER, spacing=15),
+                self.import_status,
                 ft.Container(
                     bgcolor="white",
                     padding=15,
@@ -121,32 +230,81 @@ class TransactionRecord:
                     width=850,
                     border=ft.border.all(1, "#90CAF9"),
                     content=ft.Column([self.table], expand=True, scroll=ft.ScrollMode.AUTO)
-                )
+                ),
+                ft.Text("Ledger History", size=18, weight=ft.FontWeight.BOLD, color="#0D47A1"),
+                ft.Container(
+                    bgcolor="white",
+                    padding=15,
+                    border_radius=15,
+                    width=850,
+                    border=ft.border.all(1, "#90CAF9"),
+                    content=ft.Column([self.history_header, self.history_list], spacing=0)
+                ),
+                ft.Text("Filter Ledger", size=18, weight=ft.FontWeight.BOLD, color="#0D47A1"),
+                ft.Row([self.filter_from_field, self.filter_to_field, self.filter_type_dropdown, self.filter_classification_dropdown],
+                       alignment=ft.MainAxisAlignment.CENTER, spacing=10),
+                ft.Row([self.filter_min_field, self.filter_max_field, self.filter_group_dropdown, self.filter_button],
+                       alignment=ft.MainAxisAlignment.CENTER, spacing=10),
+                ft.Container(
+                    bgcolor="white",
+                    padding=15,
+                    border_radius=15,
+                    height=260,
+                    width=850,
+                    border=ft.border.all(1, "#90CAF9"),
+                    content=ft.Column([self.filter_summary, self.filter_table], expand=True, scroll=ft.ScrollMode.AUTO)
+                ),
+                ft.Text("Search Ledger", size=18, weight=ft.FontWeight.BOLD, color="#0D47A1"),
+                ft.Row([self.search_field, self.search_from_field, self.search_to_field],
+                       alignment=ft.MainAxisAlignment.CENTER, spacing=10),
+                ft.Row([self.search_classification_dropdown, self.search_button],
+                       alignment=ft.MainAxisAlignment.CENTER, spacing=10),
+                ft.Container(
+                    bgcolor="white",
+                    padding=15,
+                    border_radius=15,
+                    height=300,
+                    width=850,
+                    border=ft.border.all(1, "#90CAF9"),
+                    content=ft.Column([self.search_table], expand=True, scroll=ft.ScrollMode.AUTO)
+                ),
+                ft.Row([self.search_prev_button, self.search_page_text, self.search_next_button],
+                       alignment=ft.MainAxisAlignment.CENTER, spacing=5)
             ]
         )
 
         self.view.controls.clear()
         self.view.controls.append(self.main_layout)
-        self.load_balance()
-
+        self.load_history()
+
+    def reset(self):
+        # Called when the screen is shown again; unsaved entries are kept
+        self.finish_editing()
+        for field in (self.date_field, self.type_dropdown, self.particular_field, self.amount_field,
+                      self.classification_dropdown, self.new_category_field):
+            field.value = ""
+        self.selected_ids = {row_id for row_id in self.selected_ids if row_id < 0}
+        self.refresh_pending_balances()
+        self.load_history()
+
+    @UpdateScheduler.handler
     def open_date_picker(self):
-        self.date_picker.open = True
-        self.page.update()
+        self.views.pick_date(self.date_selected)
 
-    def date_selected(self, e):
-        if self.date_picker.value:
-            picked = self.date_picker.value
-            self.date_field.value = picked.strftime("%d/%m/%Y")
-            self.type_dropdown.focus()
-            self.page.update()
+    @UpdateScheduler.handler
+    def date_selected(self, picked):
+        self.date_field.value = picked.strftime("%d/%m/%Y")
+        self.type_dropdown.focus()
+        self.updates.request(self.date_field)
 
+    @UpdateScheduler.handler
     def go_back(self, e):
         if len(self.page.views) > 1:
             self.page.views.pop()
-            self.page.update()
+            self.updates.request()
 
     def create_data_table(self):
-        return ft.DataTable(columns=[
+        return ft.DataTable(show_checkbox_column=True, columns=[
             ft.DataColumn(ft.Text("Date", size=14)),
             ft.DataColumn(ft.Text("Particular", size=14)),
             ft.DataColumn(ft.Text("Income", size=14)),
@@ -156,6 +314,29 @@ class TransactionRecord:
             ft.DataColumn(ft.Text("Actions", size=14)),
         ], rows=[])
 
+    def load_classifications(self):
+        try:
+            return Ledger.list_classifications(self.user_id)
+        except Exception:
+            return list(Ledger.DEFAULT_CLASSIFICATIONS)
+
+    @UpdateScheduler.handler
+    def add_category(self, e):
+        try:
+            name = Ledger.add_classification(self.user_id, self.new_category_field.value)
+        except Exception as ex:
+            self.show_snack_bar(str(ex), "red")
+            return
+        names = self.load_classifications()
+        if name not in names:
+            names.append(name)
+        self.classification_dropdown.options = [ft.dropdown.Option(n) for n in names]
+        self.classification_dropdown.value = name
+        self.new_category_field.value = ""
+        self.add_button.focus()
+        self.updates.request(self.classification_dropdown, self.new_category_field)
+
+    @UpdateScheduler.handler(burst=True)
     def add_entry(self, e):
         particular = self.particular_field.value
         amount = self.amount_field.value
@@ -168,41 +349,104 @@ class TransactionRecord:
             return
 
         try:
-            amount_val = float(amount)
+            amount_val = Ledger.to_paise(amount)
         except ValueError:
             self.show_snack_bar("Invalid amount.", "red")
             return
 
-        income = amount_val if entry_type == "Income" else ""
-        expense = amount_val if entry_type == "Expense" else ""
-        self.balance += amount_val if entry_type == "Income" else -amount_val
-
-        delete_icon = ft.IconButton(
-            icon="delete",
-            on_click=lambda e, r=(date_val, particular, amount_val, entry_type, classification): self.delete_entry(r)
-        )
-
-        self.table.rows.append(ft.DataRow(cells=[
-            ft.DataCell(ft.Text(date_val, size=14)),
-            ft.DataCell(ft.Text(particular, size=14)),
-            ft.DataCell(ft.Text(str(income), size=14)),
-            ft.DataCell(ft.Text(str(expense), size=14)),
-            ft.DataCell(ft.Text(str(self.balance), size=14)),
-            ft.DataCell(ft.Text(classification, size=14)),
-            ft.DataCell(delete_icon)
-        ]))
-
-        self.entries.append({
-            "date": datetime.datetime.strptime(date_val, "%d/%m/%Y").strftime("%Y-%m-%d"),
+        entry = {
+            "date": date_val,
             "particular": particular,
-            "amount": amount_val,
+            "amount": amount,
             "type": entry_type,
             "classification": classification
-        })
-
+        }
+        try:
+            normalized = Ledger.normalize_transaction(entry)
+        except ValueError as ex:
+            self.show_snack_bar(str(ex), "red")
+            return
 
+        if self.editing_id is None:
+            self.add_pending(entry, normalized)
+        elif self.editing_id < 0:
+            self.update_pending(self.editing_id, entry, normalized)
+        else:
+            try:
+                Ledger.update_transaction(self.user_id, self.editing_id, entry)
+            except Exception as ex:
+                self.show_snack_bar(f"Error saving: {str(ex)}", "red")
+                return
+            self.update_history_row(self.editing_id, normalized)
+
+        self.finish_editing()
         self.clear_inputs()
-        self.page.update()
+        self.updates.request(self.table, self.history_list, *self.form_controls)
+
+    def pending_cells(self, row_id, entry, normalized):
+        amount = Ledger.format_money(normalized[2])
+        return [
+            ft.DataCell(ft.Text(entry["date"], size=14)),
+            ft.DataCell(ft.Text(normalized[1], size=14)),
+            ft.DataCell(ft.Text(amount if entry["type"] == "Income" else "", size=14)),
+            ft.DataCell(ft.Text(amount if entry["type"] == "Expense" else "", size=14)),
+            ft.DataCell(ft.Text("", size=14)),
+            ft.DataCell(ft.Text(entry["classification"], size=14)),
+            ft.DataCell(ft.Row([
+                ft.IconButton(icon="edit", on_click=lambda e, i=row_id: self.edit_entry(i)),
+                ft.IconButton(icon="delete", on_click=lambda e, i=row_id: self.delete_entry(i)),
+            ], spacing=0)),
+        ]
+
+    def add_pending(self, entry, normalized):
+        row_id = self.next_temp_id
+        self.next_temp_id -= 1
+        date, _, amount, entry_type, _ = normalized
+        row = ft.DataRow(
+            cells=self.pending_cells(row_id, entry, normalized),
+            data=(date, amount if entry_type == "Income" else -amount),
+            on_select_changed=lambda e, i=row_id: self.select_row(i, e.data == "true")
+        )
+        self.table.rows.append(row)
+        self.pending_rows[row_id] = row
+        self.entries[row_id] = entry
+        self.refresh_pending_balances()
+
+    def update_pending(self, row_id, entry, normalized):
+        row = self.pending_rows.get(row_id)
+        if row is None:
+            return
+        date, _, amount, entry_type, _ = normalized
+        row.cells = self.pending_cells(row_id, entry, normalized)
+        row.data = (date, amount if entry_type == "Income" else -amount)
+        self.entries[row_id] = entry
+        self.refresh_pending_balances()
+
+    @UpdateScheduler.handler
+    def edit_entry(self, row_id):
+        # Load a pending or saved row into the form; Add then writes it back by id
+        if row_id < 0:
+            entry = self.entries.get(row_id)
+            if entry is None:
+                return
+            values = (entry["date"], entry["particular"], entry["amount"], entry["type"], entry["classification"])
+        else:
+            control = self.history_index.get(row_id)
+            if control is None:
+                return
+            _, date, particular, amount, entry_type, classification = control.data
+            values = (datetime.date.fromisoformat(date).strftime("%d/%m/%Y"), particular, Ledger.format_money(amount),
+                      entry_type, classification)
+        (self.date_field.value, self.particular_field.value, self.amount_field.value,
+         self.type_dropdown.value, self.classification_dropdown.value) = values
+        self.editing_id = row_id
+        self.add_button.text = "Update"
+        self.particular_field.focus()
+        self.updates.request(*self.form_controls)
+
+    def finish_editing(self):
+        self.editing_id = None
+        self.add_button.text = "Add"
 
     def clear_inputs(self):
         self.particular_field.value = ""
@@ -212,58 +456,381 @@ class TransactionRecord:
         self.classification_dropdown.value = ""
         self.particular_field.focus()
 
-    def delete_entry(self, entry):
-        self.table.rows = [r for r in self.table.rows if not (
-            r.cells[0].content.value == entry[0] and
-            r.cells[1].content.value == entry[1]
-        )]
-        self.page.update()
-
+    @UpdateScheduler.handler
+    def select_row(self, row_id, selected):
+        if selected:
+            self.selected_ids.add(row_id)
+        else:
+            self.selected_ids.discard(row_id)
+        row = self.pending_rows.get(row_id)
+        if row is not None:
+            row.selected = selected
+            self.updates.request(self.table)
+
+    @UpdateScheduler.handler
+    def delete_entry(self, row_id):
+        self.delete_rows([row_id])
+
+    @UpdateScheduler.handler
+    def delete_selected(self, e):
+        if not self.selected_ids:
+            self.show_snack_bar("Select entries to delete first.", "red")
+            return
+        self.delete_rows(list(self.selected_ids))
+
+    def delete_rows(self, ids):
+        saved = [row_id for row_id in ids if row_id > 0]
+        if saved:
+            try:
+                Ledger.delete_transactions(self.user_id, saved)
+            except Exception as ex:
+                self.show_snack_bar(f"Error deleting: {str(ex)}", "red")
+                return
+            self.remove_history_rows(saved)
+        for row_id in ids:
+            self.selected_ids.discard(row_id)
+            if row_id < 0:
+                self.remove_pending(row_id)
+        if self.editing_id in ids:
+            self.finish_editing()
+            self.clear_inputs()
+            self.updates.request(*self.form_controls)
+        self.refresh_pending_balances()
+        self.updates.request(self.table, self.history_list)
+
+    def remove_pending(self, row_id):
+        # Rows are hidden in place and the table list is compacted only once most of it is dead,
+        # so deleting stays constant time however long the table grows
+        self.entries.pop(row_id, None)
+        row = self.pending_rows.pop(row_id, None)
+        if row is None:
+            return
+        row.visible = False
+        self.hidden_rows += 1
+        if self.hidden_rows > len(self.pending_rows):
+            self.table.rows = list(self.pending_rows.values())
+            self.hidden_rows = 0
+
+    def refresh_pending_balances(self):
+        # Unsaved rows sit on top of the saved ledger as of their own date, so a
+        # back-dated entry shows the balance it will really have once saved
+        try:
+            index = RunningBalance.get_index(self.user_id)
+        except Exception:
+            return
+        # Temporary ids count down as rows are added, so -id is the order of entry
+        rows = [row for _, row in sorted(self.pending_rows.items(), key=lambda item: (item[1].data[0], -item[0]))]
+        saved = index.balances_through([row.data[0] for row in rows])
+        pending = 0
+        for row, balance in zip(rows, saved):
+            pending += row.data[1]
+            row.cells[4].content.value = Ledger.format_money(balance + pending)
+
+    @UpdateScheduler.handler
     def save_to_database(self, e):
         if not self.entries:
             self.show_snack_bar("No new entries to save.", "red")
             return
 
         try:
-            conn = sqlite3.connect(get_db_path())
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS transactions (
-                    id INTEGER PRIMARY KEY,
-                    date TEXT,
-                    particular TEXT,
-                    amount REAL,
-                    type TEXT,
-                    classification TEXT
-                )
-            ''')
-            for entry in self.entries:
-                cursor.execute('''
-                    INSERT INTO transactions (date, particular, amount, type, classification)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (entry["date"], entry["particular"], entry["amount"], entry["type"], entry["classification"]))
-            conn.commit()
-            conn.close()
+            Ledger.ingest_transactions(self.user_id, self.entries.values())
             self.entries.clear()
+            self.pending_rows.clear()
+            self.table.rows.clear()
+            self.hidden_rows = 0
+            self.updates.request(self.table)
+            self.selected_ids = {row_id for row_id in self.selected_ids if row_id > 0}
+            if self.editing_id is not None and self.editing_id < 0:
+                self.finish_editing()
+            self.load_history()
             self.show_snack_bar("Saved successfully!", "green")
         except Exception as ex:
             self.show_snack_bar(f"Error saving: {str(ex)}", "red")
 
-    def load_balance(self):
+    def request_import_file(self, e):
+        self.views.pick_files(
+            self.import_file_selected,
+            dialog_title="Import Bank Statement",
+            allowed_extensions=["csv", "ofx", "qfx"],
+            allow_multiple=False
+        )
+
+    @UpdateScheduler.handler
+    def import_file_selected(self, e: ft.FilePickerResultEvent):
+        if not e.files:
+            return
+        self.import_button.disabled = True
+        self.import_status.value = "Importing..."
+        self.updates.request(self.import_button, self.import_status)
+        # A large statement takes tens of seconds (about 35k rows/s), so it runs
+        # off the event thread and reports after each committed batch
+        threading.Thread(target=self.run_import, args=(e.files[0].path,), name="statement-import", daemon=True).start()
+
+    def run_import(self, path):
+        try:
+            stats = Importer.import_file(self.user_id, path, progress=self.import_progress)
+        except Exception as ex:
+            stats, error = None, ex
+        self.updates.begin("import_done")
+        try:
+            if stats is None:
+                self.show_snack_bar(f"Import failed: {str(error)}", "red")
+            else:
+                self.load_history()
+                self.show_snack_bar(stats.summary(), "green" if not stats.rejected else "orange")
+            self.import_button.disabled = False
+            self.import_status.value = ""
+            self.updates.request(self.import_button, self.import_status)
+        finally:
+            self.updates.end()
+
+    def import_progress(self, stats):
+        # Runs on the import thread after each committed batch
+        self.import_status.value = f"Imported {stats.imported:,} rows ({stats.rows_per_second:,.0f} rows/s)..."
+        self.updates.request(self.import_status)
+
+    @UpdateScheduler.handler
+    def apply_filter(self, e):
+        def parse_day(field):
+            return datetime.datetime.strptime(field.value.strip(), "%d/%m/%Y").date() if field.value and field.value.strip() else None
+
+        def parse_amount(field):
+            return Ledger.to_paise(field.value) if field.value and field.value.strip() else None
+
+        try:
+            start, last = parse_day(self.filter_from_field), parse_day(self.filter_to_field)
+            min_amount, max_amount = parse_amount(self.filter_min_field), parse_amount(self.filter_max_field)
+        except ValueError:
+            self.show_snack_bar("Use DD/MM/YYYY dates and numeric amounts.", "red")
+            return
+
+        try:
+            # The columnar cache loads the whole ledger into NumPy arrays, so only pay for it on first use
+            import ColumnarLedger
+            ledger = ColumnarLedger.get_ledger(self.user_id)
+            selected = ledger.mask(
+                start=start,
+                end=last + datetime.timedelta(days=1) if last else None,
+                entry_type=None if self.filter_type_dropdown.value == "Any" else self.filter_type_dropdown.value,
+                classification=None if self.filter_classification_dropdown.value == "Any" else self.filter_classification_dropdown.value,
+                min_amount=min_amount,
+                max_amount=max_amount,
+            )
+            total, count = ledger.total(selected)
+            groups = ledger.summarize(selected, self.filter_group_dropdown.value)
+        except Exception as ex:
+            self.show_snack_bar(f"Filter failed: {str(ex)}", "red")
+            return
+
+        self.filter_classification_dropdown.options = [ft.dropdown.Option("Any")] + [
+            ft.dropdown.Option(name) for name in sorted(ledger.classification_names) if name
+        ]
+        self.filter_summary.value = f"{count} matching entries, total ₹ {Ledger.format_money(total)}"
+        self.filter_table.rows = [
+            ft.DataRow(cells=[
+                ft.DataCell(ft.Text(name or "Unclassified", size=14)),
+                ft.DataCell(ft.Text(Ledger.format_money(group_total), size=14)),
+                ft.DataCell(ft.Text(str(group_count), size=14)),
+            ])
+            for name, group_total, group_count in groups
+        ]
+        self.updates.request(self.filter_classification_dropdown, self.filter_summary, self.filter_table)
+
+    @UpdateScheduler.handler
+    def search(self, page):
+        try:
+            start = datetime.datetime.strptime(self.search_from_field.value.strip(), "%d/%m/%Y").date() if self.search_from_field.value else None
+            last = datetime.datetime.strptime(self.search_to_field.value.strip(), "%d/%m/%Y").date() if self.search_to_field.value else None
+        except ValueError:
+            self.show_snack_bar("Use DD/MM/YYYY dates.", "red")
+            return
+        classification = self.search_classification_dropdown.value
+        try:
+            rows, has_more = Ledger.search_transactions(
+                self.user_id, self.search_field.value,
+                start=Ledger.normalize_date(start) if start else None,
+                end=Ledger.normalize_date(last + datetime.timedelta(days=1)) if last else None,
+                classification=None if classification == "Any" else classification,
+                before=self.search_cursors[page] if 0 < page < len(self.search_cursors) else None,
+            )
+        except ValueError as ex:
+            self.show_snack_bar(str(ex), "red")
+            return
+        except Exception as ex:
+            self.show_snack_bar(f"Search failed: {str(ex)}", "red")
+            return
+
+        self.search_page = page if 0 < page < len(self.search_cursors) else 0
+        del self.search_cursors[self.search_page + 1:]
+        if has_more:
+            self.search_cursors.append(rows[-1][0])
+        self.search_table.rows = [
+            ft.DataRow(cells=[
+                ft.DataCell(ft.Text(date, size=14)),
+                ft.DataCell(ft.Text(particular, size=14)),
+                ft.DataCell(ft.Text(Ledger.format_money(amount), size=14)),
+                ft.DataCell(ft.Text(entry_type or "", size=14)),
+                ft.DataCell(ft.Text(name or "", size=14)),
+            ])
+            for _, date, particular, amount, entry_type, name in rows
+        ]
+        self.search_prev_button.disabled = self.search_page == 0
+        self.search_next_button.disabled = not has_more
+        self.search_page_text.value = f"Page {self.search_page + 1}" if rows else "No matches"
+        self.updates.request(self.search_table, self.search_prev_button, self.search_next_button, self.search_page_text)
+
+    def history_row_control(self, values, bold=False, actions=(), data=None):
+        weight = ft.FontWeight.BOLD if bold else None
+        date, particular, income, expense, balance, classification = values
+        return ft.Container(
+            height=HISTORY_ROW_HEIGHT,
+            data=data,
+            content=ft.Row([
+                ft.Text(date, size=14, width=110, weight=weight),
+                ft.Text(particular, size=14, expand=True, no_wrap=True, weight=weight),
+                ft.Text(income, size=14, width=110, text_align=ft.TextAlign.RIGHT, weight=weight),
+                ft.Text(expense, size=14, width=110, text_align=ft.TextAlign.RIGHT, weight=weight),
+                ft.Text(balance, size=14, width=120, text_align=ft.TextAlign.RIGHT, weight=weight),
+                ft.Text(classification, size=14, width=130, weight=weight),
+                *actions,
+            ], spacing=10)
+        )
+
+    def history_control(self, row, balance):
+        row_id, date, particular, amount, entry_type, classification = row
+        money = Ledger.format_money(amount)
+        control = self.history_row_control((
+            date, particular,
+            money if entry_type == "Income" else "",
+            money if entry_type == "Expense" else "",
+            Ledger.format_money(balance),
+            classification or "",
+        ), actions=[ft.Row([
+            ft.Checkbox(value=row_id in self.selected_ids, on_change=lambda e, i=row_id: self.select_row(i, e.control.value)),
+            ft.IconButton(icon="edit", icon_size=18, on_click=lambda e, i=row_id: self.edit_entry(i)),
+            ft.IconButton(icon="delete", icon_size=18, on_click=lambda e, i=row_id: self.delete_entry(i)),
+        ], spacing=0, width=HISTORY_ACTIONS_WIDTH)], data=row)
+        self.history_index[row_id] = control
+        return control
+
+    def history_controls(self, rows):
+        # One index lookup for the newest row of the page; each older row is the one above minus its own amount
+        if not rows:
+            return []
+        balance = RunningBalance.get_index(self.user_id).balance_at(rows[0][1], rows[0][0])
+        controls = []
+        for row in rows:
+            controls.append(self.history_control(row, balance))
+            balance -= row[3] if row[4] == "Income" else -row[3]
+        return controls
+
+    def refresh_history_balances(self):
+        # After an edit or delete every row above the change moves by the same amount;
+        # recompute the live window from one index lookup and rewrite the texts in place
+        if not self.history_rows:
+            return
+        first = self.history_rows[0]
+        balance = RunningBalance.get_index(self.user_id).balance_at(first[1], first[0])
+        for row, control in zip(self.history_rows, self.history_list.controls):
+            control.content.controls[4].value = Ledger.format_money(balance)
+            balance -= row[3] if row[4] == "Income" else -row[3]
+
+    def remove_history_rows(self, ids):
+        removed = {row_id for row_id in ids if self.history_index.pop(row_id, None) is not None}
+        if not removed:
+            return
+        keep = [i for i, row in enumerate(self.history_rows) if row[0] not in removed]
+        self.history_rows = [self.history_rows[i] for i in keep]
+        self.history_list.controls = [self.history_list.controls[i] for i in keep]
+        if self.history_rows:
+            self.refresh_history_balances()
+        else:
+            self.load_history()
+
+    def update_history_row(self, row_id, normalized):
+        control = self.history_index.get(row_id)
+        if control is None:
+            return
+        date, particular, amount, entry_type, classification = normalized
+        if date != control.data[1]:
+            # A new date moves the row elsewhere in the ledger
+            self.load_history()
+            return
+        row = (row_id, date, particular, amount, entry_type, classification)
+        position = self.history_rows.index(control.data)
+        self.history_rows[position] = row
+        self.history_list.controls[position] = self.history_control(row, 0)
+        self.refresh_history_balances()
+
+    def load_history(self):
+        try:
+            rows = Ledger.fetch_history(self.user_id)
+        except Exception as ex:
+            self.show_snack_bar(f"Could not load history: {str(ex)}", "red")
+            return
+        self.history_rows = rows
+        self.history_index = {}
+        self.history_list.controls = self.history_controls(rows)
+        self.history_at_start = True
+        self.history_at_end = len(rows) < Ledger.HISTORY_PAGE_SIZE
+        self.updates.request(self.history_list)
+
+    @UpdateScheduler.handler
+    def history_scrolled(self, e):
+        if self.history_loading or not self.history_rows:
+            return
+        near_end = e.pixels >= e.max_scroll_extent - HISTORY_PREFETCH_ROWS * HISTORY_ROW_HEIGHT
+        near_start = e.pixels <= HISTORY_PREFETCH_ROWS * HISTORY_ROW_HEIGHT
+        if not (near_end and not self.history_at_end) and not (near_start and not self.history_at_start):
+            return
+        self.history_loading = True
         try:
-            conn = sqlite3.connect(get_db_path())
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT SUM(CASE WHEN type='Income' THEN amount ELSE 0 END) -
-                       SUM(CASE WHEN type='Expense' THEN amount ELSE 0 END)
-                FROM transactions
-            ''')
-            self.balance = cursor.fetchone()[0] or 0
-            conn.close()
-        except:
-            self.balance = 0
+            if near_end and not self.history_at_end:
+                self.page_history_down(e.pixels)
+            else:
+                self.page_history_up(e.pixels)
+        finally:
+            self.history_loading = False
+
+    def page_history_down(self, pixels):
+        last = self.history_rows[-1]
+        rows = Ledger.fetch_history(self.user_id, before=(last[1], last[0]))
+        self.history_at_end = len(rows) < Ledger.HISTORY_PAGE_SIZE
+        self.history_rows += rows
+        self.history_list.controls += self.history_controls(rows)
+        dropped = max(0, len(self.history_rows) - HISTORY_WINDOW)
+        if dropped:
+            for row in self.history_rows[:dropped]:
+                self.history_index.pop(row[0], None)
+            del self.history_rows[:dropped]
+            del self.history_list.controls[:dropped]
+            self.history_at_start = False
+        # The new rows have to be on the client before scroll_to can land on them
+        self.updates.request(self.history_list)
+        self.updates.flush()
+        if dropped:
+            # Keep the rows under the pointer where they were
+            self.history_list.scroll_to(offset=pixels - dropped * HISTORY_ROW_HEIGHT, duration=0)
+
+    def page_history_up(self, pixels):
+        first = self.history_rows[0]
+        rows = Ledger.fetch_history(self.user_id, after=(first[1], first[0]))
+        self.history_at_start = len(rows) < Ledger.HISTORY_PAGE_SIZE
+        self.history_rows[:0] = rows
+        self.history_list.controls[:0] = self.history_controls(rows)
+        dropped = max(0, len(self.history_rows) - HISTORY_WINDOW)
+        if dropped:
+            for row in self.history_rows[-dropped:]:
+                self.history_index.pop(row[0], None)
+            del self.history_rows[-dropped:]
+            del self.history_list.controls[-dropped:]
+            self.history_at_end = False
+        self.updates.request(self.history_list)
+        self.updates.flush()
+        if rows:
+            self.history_list.scroll_to(offset=pixels + len(rows) * HISTORY_ROW_HEIGHT, duration=0)
 
     def show_snack_bar(self, msg, color):
         self.page.snack_bar = ft.SnackBar(ft.Text(msg, size=14), bgcolor=color)
         self.page.snack_bar.open = True
-        self.page.update()
\ No newline at end of file
+        self.updates.request()
\ No newline at end of file
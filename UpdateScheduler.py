@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+# A burst handler that fires again within this many seconds of its last call is
+# treated as part of a bulk add, and its updates wait until the burst goes quiet
+BURST_WINDOW = 0.25
+
+# PF_UPDATE_STATS=1 logs round trips per action to stderr as they happen, and a
+# busiest-first summary at logout
+REPORT_STATS = bool(os.getenv("PF_UPDATE_STATS"))
+
+log = logging.getLogger(__name__)
+if REPORT_STATS:
+    log.setLevel(logging.INFO)
+    log.addHandler(logging.StreamHandler())
+
+
+class UpdateScheduler:
+    # Collects update requests for one page and sends each handler's worth as a
+    # single page.update(*controls) round-trip when the outermost handler returns.
+    # Every round-trip to the client, including ones flet makes for focus() or
+    # control.update(), is counted against the action that caused it.
+    def __init__(self, page):
+        self.page = page
+        self.controls = []
+        self.whole_page = False
+        self.depth = 0
+        self.action = None
+        self.timer = None
+        self.last_seen = {}
+        self.stats = {}
+        self._lock = threading.RLock()
+        self._send = page.update
+        page.update = self._counted_update
+
+    def _counted_update(self, *controls):
+        with self._lock:
+            calls, round_trips = self.stats.get(self.action or "other", (0, 0))
+            self.stats[self.action or "other"] = (calls, round_trips + 1)
+        self._send(*controls)
+
+    def request(self, *controls):
+        # No controls means something on the page itself changed (snack bar, views, window)
+        with self._lock:
+            if not controls:
+                self.whole_page = True
+            for control in controls:
+                if not any(control is queued for queued in self.controls):
+                    self.controls.append(control)
+            if self.depth == 0 and self.timer is None:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.whole_page and not self.controls:
+                return
+            controls = () if self.whole_page else tuple(self.controls)
+            self.controls, self.whole_page = [], False
+            self.page.update(*controls)
+
+    def _flush_burst(self, action):
+        with self._lock:
+            self.timer = None
+            previous, self.action = self.action, action
+            try:
+                self.flush()
+            finally:
+                self.action = previous
+
+    def begin(self, action):
+        with self._lock:
+            if self.depth == 0:
+                self.action = action
+                calls, round_trips = self.stats.get(action, (0, 0))
+                self.stats[action] = (calls + 1, round_trips)
+            self.depth += 1
+
+    def end(self, burst=False):
+        with self._lock:
+            self.depth -= 1
+            if self.depth:
+                return
+            action, now = self.action, time.monotonic()
+            rapid = burst and now - self.last_seen.get(action, 0) < BURST_WINDOW
+            self.last_seen[action] = now
+            if rapid:
+                if self.timer is not None:
+                    self.timer.cancel()
+                self.timer = threading.Timer(BURST_WINDOW, self._flush_burst, (action,))
+                self.timer.daemon = True
+                self.timer.start()
+            else:
+                self.flush()
+            if REPORT_STATS:
+                calls, round_trips = self.stats[action]
+                log.info("%s: %d round trips over %d calls", action, round_trips, calls)
+            self.action = None
+
+    def summary(self):
+        # (action, calls, round trips), busiest first
+        with self._lock:
+            return sorted(((action, calls, trips) for action, (calls, trips) in self.stats.items()),
+                          key=lambda item: item[2], reverse=True)
+
+    def report(self):
+        if REPORT_STATS:
+            for action, calls, round_trips in self.summary():
+                log.info("%-30s %6d calls %6d round trips", action, calls, round_trips)
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(page):
+    with _schedulers_lock:
+        scheduler = _schedulers.get(id(page))
+        if scheduler is None or scheduler.page is not page:
+            scheduler = _schedulers[id(page)] = UpdateScheduler(page)
+    return scheduler
+
+
+def handler(func=None, burst=False):
+    # Wraps a screen method that flet calls for an event; updates it requests are
+    # sent together when it returns. burst=True lets rapid repeats share one flush.
+    if func is None:
+        return lambda func: handler(func, burst)
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        self.updates.begin(func.__name__)
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self.updates.end(burst)
+    return wrapper
@@ -0,0 +1,80 @@
+import datetime
+import threading
+import flet as ft
+import UpdateScheduler
+
+
+class ViewRegistry:
+    # Builds each screen once per user and page, and re-shows the same view on
+    # later visits after resetting its inputs. The screens share one date picker
+    # and one file picker, so the overlay stays the same size however long the
+    # session runs.
+    def __init__(self, page):
+        self.page = page
+        self.updates = UpdateScheduler.get_scheduler(page)
+        self.screens = {}
+        self._on_date = None
+        self._on_file = None
+        self.date_picker = ft.DatePicker(
+            on_change=self._date_picked,
+            first_date=datetime.date(2000, 1, 1),
+            last_date=datetime.date(2025, 12, 31),
+        )
+        self.file_picker = ft.FilePicker(on_result=self._file_picked)
+        page.overlay.extend([self.date_picker, self.file_picker])
+
+    def show(self, route, screen_class, user_id):
+        self.updates.begin("show:" + route)
+        try:
+            entry = self.screens.get((route, user_id))
+            if entry is None:
+                view = ft.View(route=route, controls=[], bgcolor="#E3F2FD", scroll=ft.ScrollMode.AUTO)
+                entry = self.screens[(route, user_id)] = (view, screen_class(self.page, view, user_id))
+            else:
+                entry[1].reset()
+            if not any(view is entry[0] for view in self.page.views):
+                self.page.views.append(entry[0])
+            self.page.go(route)
+        finally:
+            self.updates.end()
+        return entry[1]
+
+    def forget(self):
+        # On logout: drop every screen and any callback still pointing into one
+        self.screens.clear()
+        self._on_date = self._on_file = None
+
+    def pick_date(self, on_date):
+        # on_date(datetime) runs when the user confirms a date
+        self._on_date = on_date
+        self.date_picker.value = None
+        self.date_picker.open = True
+        self.updates.request(self.date_picker)
+
+    def _date_picked(self, e):
+        if self._on_date is not None and self.date_picker.value:
+            self._on_date(self.date_picker.value)
+
+    def pick_files(self, on_result, **kwargs):
+        self._on_file = on_result
+        self.file_picker.pick_files(**kwargs)
+
+    def save_file(self, on_result, **kwargs):
+        self._on_file = on_result
+        self.file_picker.save_file(**kwargs)
+
+    def _file_picked(self, e):
+        if self._on_file is not None:
+            self._on_file(e)
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(page):
+    with _registries_lock:
+        registry = _registries.get(id(page))
+        if registry is None or registry.page is not page:
+            registry = _registries[id(page)] = ViewRegistry(page)
+    return registry
@@ -0,0 +1,35 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ColumnarLedger
+import Database
+import ResultCache
+import RunningBalance
+import Schema
+
+
+def reset_caches():
+    RunningBalance._indexes.clear()
+    ColumnarLedger._ledgers.clear()
+    ResultCache.get_cache().clear()
+
+
+@pytest.fixture
+def empty_db(tmp_path, monkeypatch):
+    # A database file of its own under a throwaway LOCALAPPDATA, not yet migrated
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    Database.configure()
+    reset_caches()
+    yield
+    Database.close()
+    reset_caches()
+
+
+@pytest.fixture
+def db(empty_db):
+    Schema.migrate()
+    with Database.writer() as conn:
+        conn.executemany("INSERT INTO users (id, username, password) VALUES (?, ?, ?)", [(1, "asha", "x"), (2, "ravi", "y")])
@@ -0,0 +1,52 @@
+import ColumnarLedger
+import Database
+import Ledger
+
+
+def entry(date, amount, entry_type, classification):
+    return {"date": date, "particular": "entry", "amount": amount, "type": entry_type, "classification": classification}
+
+
+def seed():
+    Ledger.ingest_transactions(1, [
+        entry("2024-01-01", "1000", "Income", "Salary"),
+        entry("2024-01-02", "20.50", "Expense", "Food"),
+        entry("2024-01-20", "30", "Expense", "Food"),
+        entry("2024-02-03", "400", "Expense", "Bills/Rent"),
+    ])
+    Ledger.ingest_transactions(2, [entry("2024-01-05", "999", "Expense", "Food")])
+
+
+def test_filters_and_groups_one_users_rows(db):
+    seed()
+    ledger = ColumnarLedger.get_ledger(1)
+    assert ledger.size == 4
+    assert ledger.total(ledger.mask(entry_type="Expense")) == (45050, 3)
+    assert ledger.total(ledger.mask(start="2024-01-02", end="2024-02-01")) == (5050, 2)
+    assert ledger.total(ledger.mask(classification="Nope")) == (0, 0)
+    assert ledger.summarize(ledger.mask(entry_type="Expense")) == [("Bills/Rent", 40000, 1), ("Food", 5050, 2)]
+    assert ledger.summarize(ledger.mask(), by="month") == [("2024-01", 105050, 3), ("2024-02", 40000, 1)]
+
+
+def test_picks_up_inserts_and_rewrites(db):
+    seed()
+    ledger = ColumnarLedger.get_ledger(1)
+    Ledger.ingest_transactions(1, [entry("2024-03-01", "5", "Expense", "Food")])
+    assert ledger.total(ledger.mask(classification="Food")) == (5550, 3)
+    with Database.writer() as conn:
+        conn.execute("UPDATE transactions SET date = '2024-03-02' WHERE user_id = 1 AND amount = 3000")
+    assert ledger.total(ledger.mask(start="2024-03-01")) == (3500, 2)
+
+
+def test_rows_of_other_types_group_under_their_own_name(db):
+    seed()
+    with Database.writer() as conn:
+        conn.execute("INSERT INTO transaction_types (name) VALUES ('Transfer')")
+        conn.execute('''
+            INSERT INTO transactions (date, particular, amount, type_id, user_id)
+            SELECT '2024-01-10', 'legacy transfer', 700, id, 1 FROM transaction_types WHERE name = 'Transfer'
+        ''')
+    ledger = ColumnarLedger.get_ledger(1)
+    assert ledger.summarize(ledger.mask(), by="type") == [("Income", 100000, 1), ("Expense", 45050, 3), ("Transfer", 700, 1)]
+    assert ledger.total(ledger.mask(entry_type="Transfer")) == (700, 1)
+    assert ledger.total(ledger.mask(entry_type="Refund")) == (0, 0)
@@ -0,0 +1,41 @@
+import sqlite3
+import pytest
+import Database
+
+
+@pytest.fixture
+def table(empty_db):
+    with Database.writer() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+
+
+def values():
+    with Database.reader() as conn:
+        return [row[0] for row in conn.execute("SELECT x FROM t ORDER BY x")]
+
+
+def test_nested_writers_share_one_transaction(table):
+    with pytest.raises(RuntimeError):
+        with Database.writer() as outer:
+            outer.execute("INSERT INTO t VALUES (1)")
+            with Database.writer() as inner:
+                inner.execute("INSERT INTO t VALUES (2)")
+            raise RuntimeError
+    assert values() == []
+
+    with Database.writer() as outer:
+        outer.execute("INSERT INTO t VALUES (1)")
+        with Database.writer() as inner:
+            inner.execute("INSERT INTO t VALUES (2)")
+    assert values() == [1, 2]
+
+
+def test_readers_are_read_only(table):
+    with Database.reader() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO t VALUES (1)")
+
+
+def test_unknown_profile_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        Database.ConnectionPool(str(tmp_path / "x.db"), profile="turbo")
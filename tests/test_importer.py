@@ -0,0 +1,83 @@
+import pytest
+import Database
+import Importer
+import Ledger
+
+CSV = """Date,Description,Amount,Type
+2024-01-05,Salary January,"50,000.00",Credit
+05/01/2024,Swiggy order,-249.50,
+2024-13-40,Bad date,10,Debit
+2024-01-07,Blank amount,,Debit
+2024-01-08,Not a number,abc,Debit
+
+2024-01-09,Uber ride,(120),
+"""
+
+
+def read_data_version():
+    with Database.reader() as conn:
+        return conn.execute("SELECT version FROM data_version WHERE name = 'transactions'").fetchone()[0]
+
+
+def test_rejected_rows_are_counted_with_their_line_numbers(db, tmp_path):
+    path = tmp_path / "statement.csv"
+    path.write_text(CSV, encoding="utf-8")
+    version = read_data_version()
+    seen = []
+
+    stats = Importer.import_file(1, str(path), progress=lambda stats: seen.append(stats.imported))
+
+    assert (stats.imported, stats.rejected) == (3, 3)
+    assert [line_no for line_no, _ in stats.rejected_samples] == [4, 5, 6]
+    assert stats.rejected_samples[1][1] == "Missing amount."
+    assert seen == [3]
+    # One batch is one write, so cached reports are dropped once
+    assert read_data_version() == version + 1
+
+    rows = Ledger.fetch_history(1)
+    assert [(row[1], row[3], row[4], row[5]) for row in rows] == [
+        ("2024-01-09", 12000, "Expense", "Transportation"),
+        ("2024-01-05", 24950, "Expense", "Food"),
+        ("2024-01-05", 5000000, "Income", "Salary"),
+    ]
+    assert Ledger.verify_balance() == {}
+
+
+def test_file_of_only_rejects_writes_nothing(db, tmp_path):
+    path = tmp_path / "statement.csv"
+    path.write_text("Date,Amount\nnope,1\n2024-01-01,\n", encoding="utf-8")
+    version = read_data_version()
+    stats = Importer.import_file(1, str(path))
+    assert (stats.imported, stats.rejected) == (0, 2)
+    assert read_data_version() == version
+
+
+def test_csv_without_an_amount_column_is_refused(tmp_path):
+    path = tmp_path / "statement.csv"
+    path.write_text("Date,Description\n2024-01-01,x\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        Importer.import_file(1, str(path))
+
+
+def test_debit_credit_columns():
+    credit = Importer.normalize_csv_row({"date": "2024-01-01", "particular": "refund", "debit": "", "credit": "1,000.10"})
+    debit = Importer.normalize_csv_row({"date": "2024-01-01", "particular": "rent", "debit": "₹900", "credit": ""})
+    assert credit[2:4] == (100010, "Income")
+    assert debit[2:] == (90000, "Expense", "Bills/Rent")
+    with pytest.raises(ValueError):
+        Importer.normalize_csv_row({"date": "2024-01-01", "particular": "x", "debit": " ", "credit": ""})
+
+
+def test_ofx_import(db, tmp_path):
+    path = tmp_path / "statement.ofx"
+    path.write_text(
+        "<OFX><BANKTRANLIST>\n"
+        "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240102120000<TRNAMT>-45.10<NAME>Netflix\n</STMTTRN>\n"
+        "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>bad<TRNAMT>-1<NAME>Broken\n</STMTTRN>\n"
+        "</BANKTRANLIST></OFX>\n",
+        encoding="utf-8",
+    )
+    stats = Importer.import_file(1, str(path))
+    assert (stats.imported, stats.rejected) == (1, 1)
+    assert stats.rejected_samples[0][0] == 4
+    assert [(row[3], row[5]) for row in Ledger.fetch_history(1)] == [(4510, "Entertainment")]
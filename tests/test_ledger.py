@@ -0,0 +1,93 @@
+import pytest
+import Database
+import Ledger
+
+
+@pytest.mark.parametrize("value, paise", [
+    ("1.005", 101),
+    ("-2.345", -235),
+    ("0.015", 2),
+    (0.1, 10),
+    (2.675, 268),
+    ("1,234.56", 123456),
+    (" 7 ", 700),
+    (12, 1200),
+    ("0", 0),
+])
+def test_to_paise_rounds_half_up_from_the_typed_value(value, paise):
+    assert Ledger.to_paise(value) == paise
+
+
+@pytest.mark.parametrize("value", ["", "   ", None, "abc", "1.2.3", "inf", "NaN"])
+def test_to_paise_rejects_non_amounts(value):
+    with pytest.raises(ValueError):
+        Ledger.to_paise(value)
+
+
+@pytest.mark.parametrize("paise, text", [(0, "0.00"), (5, "0.05"), (-5, "-0.05"), (123456, "1234.56"), (-100, "-1.00")])
+def test_format_money(paise, text):
+    assert Ledger.format_money(paise) == text
+
+
+def entry(date, particular, amount, entry_type="Expense", classification="Food"):
+    return {"date": date, "particular": particular, "amount": amount, "type": entry_type, "classification": classification}
+
+
+def test_fetch_history_pages_cover_every_row_once(db):
+    # Several rows share a date, so the id half of the key decides page edges
+    entries = [entry(f"2024-01-{day:02d}", f"row {day} {n}", day + n) for day in range(1, 11) for n in range(3)]
+    Ledger.ingest_transactions(1, entries)
+    Ledger.ingest_transactions(2, [entry("2024-01-05", "other user", 1)])
+
+    pages, before = [], None
+    while True:
+        page = Ledger.fetch_history(1, before=before, limit=7)
+        if not page:
+            break
+        pages.append(page)
+        before = (page[-1][1], page[-1][0])
+    rows = [row for page in pages for row in page]
+    keys = [(row[1], row[0]) for row in rows]
+    assert len(rows) == len(entries)
+    assert keys == sorted(keys, reverse=True)
+    assert len(set(keys)) == len(keys)
+
+    # Paging back up from the second page returns the first
+    second = pages[1]
+    assert Ledger.fetch_history(1, after=(second[0][1], second[0][0]), limit=7) == pages[0]
+
+
+def test_search_is_per_user_and_paged_newest_first(db):
+    Ledger.ingest_transactions(1, [entry(f"2024-02-{day:02d}", f"grocery run {day}", 10) for day in range(1, 6)])
+    Ledger.ingest_transactions(2, [entry("2024-02-03", "grocery run other", 10)])
+
+    rows, more = Ledger.search_transactions(1, "groc", page_size=3)
+    assert more
+    assert [row[2] for row in rows] == ["grocery run 5", "grocery run 4", "grocery run 3"]
+    rows, more = Ledger.search_transactions(1, "groc", before=rows[-1][0], page_size=3)
+    assert not more
+    assert [row[2] for row in rows] == ["grocery run 2", "grocery run 1"]
+
+    assert [row[2] for row in Ledger.search_transactions(2, "grocery")[0]] == ["grocery run other"]
+    rows, _ = Ledger.search_transactions(1, "grocery", start="2024-02-02", end="2024-02-04")
+    assert [row[1] for row in rows] == ["2024-02-03", "2024-02-02"]
+    assert Ledger.search_transactions(1, "grocery", start="2025-01-01", end="2025-02-01") == ([], False)
+
+
+def test_search_reads_user_input_as_plain_words(db):
+    Ledger.ingest_transactions(1, [entry("2024-03-01", 'say "hi" OR NOT', 1)])
+    assert len(Ledger.search_transactions(1, '"hi" OR')[0]) == 1
+    with pytest.raises(ValueError):
+        Ledger.search_transactions(1, "   ")
+
+
+def test_summary_tracks_inserts_updates_and_deletes(db):
+    Ledger.ingest_transactions(1, [entry("2024-01-01", "pay", "1000.50", "Income", "Salary"), entry("2024-01-02", "tea", "20.25")])
+    assert Ledger.get_balance(1) == 98025
+    with Database.reader() as conn:
+        ids = [row[0] for row in conn.execute("SELECT id FROM transactions WHERE user_id = 1 ORDER BY id")]
+    Ledger.update_transaction(1, ids[1], entry("2024-01-03", "tea", "30"))
+    assert Ledger.get_balance(1) == 97050
+    Ledger.delete_transactions(1, [ids[0]])
+    assert Ledger.get_balance(1) == -3000
+    assert Ledger.verify_balance() == {}
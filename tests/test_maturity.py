@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+import Maturity
+
+
+def test_maturity_amounts_compound_or_pay_out():
+    amounts = Maturity.maturity_amounts([1000, 1000], [10, 10], [365, 365], [4, 4], ["Cumulative", "Non-Cumulative"])
+    assert amounts[0] == pytest.approx(1000 * 1.025 ** 4)
+    assert amounts[1] == pytest.approx(1100)
+
+
+def portfolio():
+    return {
+        "principal": np.array([1000.0, 5000.0, 250.0]),
+        "rate": np.array([7.0, 6.5, 0.1]),
+        "tenure_days": np.array([365, 730, 90]),
+        "frequency": np.array([4.0, 12.0, 1.0]),
+        "cumulative": np.array([True, False, True]),
+    }
+
+
+@pytest.mark.parametrize("tenures", [None, [180, 365]])
+def test_sweep_matches_per_deposit_evaluation(tenures):
+    shifts = [-25.5, 0, 12.5]
+    result = Maturity.sweep(portfolio(), shifts, tenures, chunk_cells=2)
+    p = portfolio()
+    for i, shift in enumerate(shifts):
+        rate = np.maximum(p["rate"] + shift / 100, 0)
+        for j, tenure in enumerate([None] if tenures is None else tenures):
+            days = p["tenure_days"] if tenure is None else tenure
+            expected = Maturity.maturity_amounts(p["principal"], rate, days, p["frequency"], p["cumulative"]).sum()
+            assert result["maturity"][i, j] == pytest.approx(expected)
+    assert result["interest"] == pytest.approx(result["maturity"] - 6250)
+
+
+def test_sweep_keeps_fractional_shifts(tmp_path):
+    result = Maturity.sweep(portfolio(), Maturity.parse_grid("-12.5; 0, 7.25"))
+    assert [row[0] for row in Maturity.sweep_rows(result)] == [-12.5, 0.0, 7.25]
+    path = tmp_path / "sweep.csv"
+    Maturity.export_sweep_csv(result, str(path))
+    assert [line.split(",")[:2] for line in path.read_text().splitlines()[1:]] == [["-12.5", "As booked"], ["0", "As booked"], ["7.25", "As booked"]]
+
+
+def test_parse_grid_needs_a_value():
+    with pytest.raises(ValueError):
+        Maturity.parse_grid(" , ;")
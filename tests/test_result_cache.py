@@ -0,0 +1,39 @@
+import Database
+import Ledger
+import ResultCache
+
+
+def test_entries_expire_when_their_tables_change(db):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert ResultCache.cached("report", "2024", 1, compute) == 1
+    assert ResultCache.cached("report", "2024", 1, compute) == 1
+    assert ResultCache.cached("report", "2024", 2, compute) == 2
+    Ledger.ingest_transactions(1, [{"date": "2024-01-01", "particular": "x", "amount": 1, "type": "Income", "classification": "Other"}])
+    assert ResultCache.cached("report", "2024", 1, compute) == 3
+    # Entries keyed on other tables survive
+    assert ResultCache.cached("deposits", "2024", 1, compute, tables=("interest_calculations",)) == 4
+    Ledger.ingest_transactions(1, [{"date": "2024-01-02", "particular": "y", "amount": 1, "type": "Income", "classification": "Other"}])
+    assert ResultCache.cached("deposits", "2024", 1, compute, tables=("interest_calculations",)) == 4
+
+
+def test_least_recently_used_entries_go_first():
+    cache = ResultCache.ResultCache(max_entries=2, max_bytes=100)
+    cache.put("a", (1,), "A", size=10)
+    cache.put("b", (1,), "B", size=10)
+    assert cache.get("a", (1,)) == "A"
+    cache.put("c", (1,), "C", size=10)
+    assert cache.get("b", (1,)) is None
+    assert (cache.get("a", (1,)), cache.get("c", (1,))) == ("A", "C")
+
+    cache.put("big", (1,), "D", size=95)
+    assert len(cache) == 1 and cache.size == 95
+    assert cache.get("big", (2,)) is None
+    assert len(cache) == 0 and cache.size == 0
+
+    cache.put("huge", (1,), "E", size=ResultCache.MAX_ENTRY_BYTES + 1)
+    assert cache.get("huge", (1,)) is None
@@ -0,0 +1,96 @@
+import datetime
+import random
+import Database
+import Ledger
+import RunningBalance
+
+
+def sql_balance_through(user_id, date):
+    with Database.reader() as conn:
+        return conn.execute('''
+            SELECT COALESCE(SUM(CASE WHEN type_id = ? THEN amount WHEN type_id = ? THEN -amount ELSE 0 END), 0)
+            FROM transactions WHERE user_id = ? AND date <= ?
+        ''', (Ledger.TYPE_IDS["Income"], Ledger.TYPE_IDS["Expense"], user_id, date)).fetchone()[0]
+
+
+def sql_balance_at(user_id, date, row_id):
+    with Database.reader() as conn:
+        return conn.execute('''
+            SELECT COALESCE(SUM(CASE WHEN type_id = ? THEN amount WHEN type_id = ? THEN -amount ELSE 0 END), 0)
+            FROM transactions WHERE user_id = ? AND (date < ? OR (date = ? AND id <= ?))
+        ''', (Ledger.TYPE_IDS["Income"], Ledger.TYPE_IDS["Expense"], user_id, date, date, row_id)).fetchone()[0]
+
+
+def assert_matches_sql(user_id):
+    index = RunningBalance.get_index(user_id)
+    with Database.reader() as conn:
+        rows = conn.execute("SELECT id, date FROM transactions WHERE user_id = ? ORDER BY date, id", (user_id,)).fetchall()
+    dates = sorted({date for _, date in rows} | {"1999-12-31", "2030-01-01"})
+    assert index.balances_through(dates) == [sql_balance_through(user_id, date) for date in dates]
+    for row_id, date in rows:
+        assert index.balance_at(date, row_id) == sql_balance_at(user_id, date, row_id)
+
+
+def entry(date, amount, entry_type):
+    return {"date": date, "particular": "entry", "amount": amount, "type": entry_type, "classification": "Other"}
+
+
+def seed(user_id, count=60):
+    rng = random.Random(user_id)
+    start = datetime.date(2024, 1, 1)
+    Ledger.ingest_transactions(user_id, [
+        entry(start + datetime.timedelta(days=rng.randrange(90)), rng.randrange(1, 50000) / 100, rng.choice(Ledger.TRANSACTION_TYPES))
+        for _ in range(count)
+    ])
+
+
+def ids_for(user_id):
+    with Database.reader() as conn:
+        return [row[0] for row in conn.execute("SELECT id FROM transactions WHERE user_id = ? ORDER BY id", (user_id,))]
+
+
+def test_balances_follow_back_dated_writes(db):
+    seed(1)
+    seed(2)
+    assert_matches_sql(1)
+
+    # Back-dated rows, including one far outside the tree's current buckets
+    Ledger.ingest_transactions(1, [entry("2024-01-15", "75.50", "Expense"), entry("2019-06-01", "10", "Income")])
+    assert_matches_sql(1)
+
+    ids = ids_for(1)
+    Ledger.update_transaction(1, ids[5], entry("2023-12-25", "123.45", "Income"))
+    assert_matches_sql(1)
+
+    Ledger.delete_transactions(1, ids[10:20])
+    assert_matches_sql(1)
+    assert_matches_sql(2)
+
+
+def test_bulk_inserts_are_seen(db):
+    seed(1)
+    assert_matches_sql(1)
+    Ledger.bulk_insert_transactions(1, [Ledger.normalize_transaction(entry("2024-02-10", "5", "Expense"))] * 3)
+    assert_matches_sql(1)
+
+
+def test_writes_that_bypass_the_ledger_rebuild_the_index(db):
+    seed(1)
+    assert_matches_sql(1)
+    ids = ids_for(1)
+    # Moving rows to another day leaves the totals alone; only the rewrite counter gives it away
+    with Database.writer() as conn:
+        conn.execute("UPDATE transactions SET date = '2024-06-30' WHERE id IN (?, ?)", (ids[0], ids[1]))
+    assert_matches_sql(1)
+    with Database.writer() as conn:
+        conn.execute("DELETE FROM transactions WHERE id = ?", (ids[2],))
+    assert_matches_sql(1)
+
+
+def test_fenwick_prefix_sums():
+    values = [3, -1, 4, 1, -5, 9, 2, -6]
+    tree = RunningBalance.FenwickTree(values)
+    assert [tree.prefix(i) for i in range(len(values) + 2)] == [sum(values[:i]) for i in range(len(values) + 2)]
+    tree.add(2, 10)
+    values[2] += 10
+    assert [tree.prefix(i) for i in range(len(values) + 1)] == [sum(values[:i]) for i in range(len(values) + 1)]
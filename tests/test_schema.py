@@ -0,0 +1,79 @@
+import pytest
+import Database
+import Ledger
+import Schema
+
+# Tables exactly as the app created them before schema versioning existed
+BASELINE_TABLES = (
+    "CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, password TEXT NOT NULL)",
+    "CREATE TABLE transactions (id INTEGER PRIMARY KEY, date TEXT, particular TEXT, amount REAL, type TEXT, classification TEXT)",
+    '''CREATE TABLE interest_calculations (id INTEGER PRIMARY KEY, deposit_date TEXT, maturity_date TEXT, amount REAL,
+        interest_rate REAL, time_of_maturity TEXT, maturity_amount REAL, deposit_type TEXT)''',
+)
+
+BASELINE_TRANSACTIONS = [
+    ("2024-01-02", "salary jan", 1000.5, "Income", "Salary"),
+    ("2024-01-03", "vet visit", 20.25, "Expense", "Pets"),
+    ("2024-02-01", "tea", 0.1, "Expense", "Food"),
+]
+
+
+def create_baseline(stop_at=None):
+    with Database.writer() as conn:
+        for sql in BASELINE_TABLES:
+            conn.execute(sql)
+        conn.executemany("INSERT INTO users (username, password) VALUES (?, ?)", [("asha", "x"), ("ravi", "y")])
+        conn.executemany("INSERT INTO transactions (date, particular, amount, type, classification) VALUES (?, ?, ?, ?, ?)", BASELINE_TRANSACTIONS)
+        conn.execute('''INSERT INTO interest_calculations
+            (deposit_date, maturity_date, amount, interest_rate, time_of_maturity, maturity_amount, deposit_type)
+            VALUES ('2024-01-01', '01/01/2025', 100, 7, '1 year(s)', 107.19, 'Cumulative')''')
+        if stop_at is not None:
+            # A file left behind by a release that shipped only the first few steps
+            conn.execute("CREATE TABLE schema_version (version INTEGER PRIMARY KEY, description TEXT NOT NULL, applied_at TEXT NOT NULL)")
+            for number, description, step in Schema.MIGRATIONS[:stop_at]:
+                step(conn)
+                conn.execute("INSERT INTO schema_version VALUES (?, ?, '2024-01-01T00:00:00')", (number, description))
+
+
+def schema_objects():
+    with Database.reader() as conn:
+        rows = conn.execute("SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name").fetchall()
+    # Compared without whitespace: ALTER TABLE rewrites keep the original statement's layout
+    return [(kind, name, "".join((sql or "").split())) for kind, name, sql in rows]
+
+
+@pytest.mark.parametrize("stop_at", [None, 3, 8])
+def test_baseline_database_migrates_to_head(empty_db, stop_at):
+    create_baseline(stop_at)
+    applied = Schema.migrate()
+    assert applied[-1][0] == Schema.LATEST_VERSION
+    assert Schema.migrate() == []
+
+    with Database.reader() as conn:
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+        assert conn.execute("SELECT user_id, income, expense, row_count FROM ledger_summary").fetchall() == [(1, 100050, 2035, 3)]
+        rows = conn.execute("SELECT date, amount, user_id FROM transactions ORDER BY id").fetchall()
+        assert rows == [("2024-01-02", 100050, 1), ("2024-01-03", 2025, 1), ("2024-02-01", 10, 1)]
+        rollup = conn.execute("SELECT year, month, type, classification, total, count FROM monthly_rollup WHERE type != 'Interest' ORDER BY 1, 2, 3").fetchall()
+        assert rollup == [(2024, 1, "Expense", "Pets", 2025, 1), (2024, 1, "Income", "Salary", 100050, 1), (2024, 2, "Expense", "Food", 10, 1)]
+        # Categories the baseline rows invented belong to the account that owned those rows
+        assert conn.execute("SELECT user_id FROM classifications WHERE name = 'Pets'").fetchall() == [(1,)]
+        assert conn.execute("SELECT tenure_days, user_id FROM interest_calculations").fetchall() == [(365, 1)]
+    assert Ledger.verify_balance() == {}
+
+    # The migrated file takes new writes like a fresh one
+    Ledger.ingest_transactions(2, [{"date": "2024-03-01", "particular": "vet visit", "amount": "5", "type": "Expense", "classification": "Pets"}])
+    assert [row[2] for row in Ledger.search_transactions(2, "vet")[0]] == ["vet visit"]
+    assert [row[2] for row in Ledger.search_transactions(1, "vet")[0]] == ["vet visit"]
+    assert Ledger.get_balance(2) == -500
+    assert Ledger.verify_balance() == {}
+
+
+def test_migrated_schema_matches_a_fresh_one(tmp_path, empty_db):
+    create_baseline()
+    Schema.migrate()
+    migrated = schema_objects()
+
+    Database.configure(str(tmp_path / "fresh.db"))
+    Schema.migrate()
+    assert schema_objects() == migrated